@@ -13,4 +13,10 @@ from django.core.asgi import get_asgi_application
 
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'tokenwise.settings')
 
+# Route the read endpoints to their async implementations when served over ASGI,
+# e.g. `uvicorn tokenwise.asgi:application --workers 4`.
+os.environ.setdefault('ASYNC_READ_VIEWS', 'true')
+# Persistent connections do not work under ASGI; see DB_CONN_MAX_AGE in settings.
+os.environ.setdefault('TOKENWISE_PROCESS_TYPE', 'asgi')
+
 application = get_asgi_application()
@@ -0,0 +1,273 @@
+import os
+from collections import deque
+from datetime import timedelta
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.utils import timezone
+from .clients import get_redis_client
+from .models import Alert
+from .serializers import TOKEN_DECIMALS
+
+
+class MemoryWindowStore:
+    """
+    Per-wallet sliding-window sums kept in process memory.
+    Each wallet has a ring buffer of (timestamp, member, amount) events and a running total;
+    every event is appended and evicted once, so updates are O(1) amortised. Like the Redis
+    store, adding a member that is already in the window is a no-op.
+    State is per process: use RedisWindowStore when several workers ingest.
+    """
+
+    def __init__(self):
+        self._windows = {}
+
+    def add(self, key, timestamp, member, amount, window_seconds):
+        """Adds an event and returns the window total (before, after) adding it."""
+        events, members, total = self._windows.get(key, (deque(), set(), 0))
+        before = total
+        newest = events[-1][0] if events else timestamp
+        if member not in members and timestamp >= newest - window_seconds:
+            # Late events are stamped with the newest time so the buffer stays sorted.
+            events.append((max(timestamp, newest), member, amount))
+            members.add(member)
+            total += amount
+            newest = max(timestamp, newest)
+        while events and events[0][0] < newest - window_seconds:
+            _, expired, expired_amount = events.popleft()
+            members.discard(expired)
+            total -= expired_amount
+        self._windows[key] = (events, members, total)
+        return before, total
+
+    def add_many(self, key, events, window_seconds):
+        """Adds (timestamp, member, amount) events in order and returns the (before, after) totals of each."""
+        return [self.add(key, timestamp, member, amount, window_seconds) for timestamp, member, amount in events]
+
+
+# KEYS: sorted set of "member:amount" scored by timestamp, running total.
+# ARGV: timestamp, member, amount, window seconds.
+# Adding is idempotent per member, and every event is evicted exactly once.
+_WINDOW_ADD_SCRIPT = """
+local before = tonumber(redis.call('GET', KEYS[2]) or '0')
+if redis.call('ZADD', KEYS[1], 'NX', ARGV[1], ARGV[2] .. ':' .. ARGV[3]) == 1 then
+    redis.call('INCRBYFLOAT', KEYS[2], ARGV[3])
+end
+local newest = tonumber(redis.call('ZREVRANGE', KEYS[1], 0, 0, 'WITHSCORES')[2])
+local cutoff = '(' .. tostring(newest - tonumber(ARGV[4]))
+local expired = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', cutoff)
+for _, event in ipairs(expired) do
+    local amount = tonumber(string.match(event, ':([^:]+)$'))
+    redis.call('INCRBYFLOAT', KEYS[2], tostring(-amount))
+end
+if #expired > 0 then
+    redis.call('ZREMRANGEBYSCORE', KEYS[1], '-inf', cutoff)
+end
+redis.call('EXPIRE', KEYS[1], ARGV[4])
+redis.call('EXPIRE', KEYS[2], ARGV[4])
+return {tostring(before), redis.call('GET', KEYS[2])}
+"""
+
+
+class RedisWindowStore:
+    """Per-wallet sliding-window sums kept in Redis sorted sets, shared by every worker."""
+    key_prefix = 'tokenwise:alerts:window'
+
+    def __init__(self, client):
+        self._client = client
+        self._add = client.register_script(_WINDOW_ADD_SCRIPT)
+
+    def add(self, key, timestamp, member, amount, window_seconds):
+        """Adds an event and returns the window total (before, after) adding it."""
+        return self.add_many(key, [(timestamp, member, amount)], window_seconds)[0]
+
+    def add_many(self, key, events, window_seconds):
+        """
+        Adds (timestamp, member, amount) events in order and returns the (before, after) totals
+        of each. The whole batch is pipelined into a single round trip.
+        """
+        if not events:
+            return []
+        keys = [f'{self.key_prefix}:{key}', f'{self.key_prefix}:{key}:total']
+        pipe = self._client.pipeline(transaction=False)
+        for timestamp, member, amount in events:
+            self._add(keys=keys, args=[timestamp, member, amount, int(window_seconds)], client=pipe)
+        return [(float(before), float(after)) for before, after in pipe.execute()]
+
+
+class LargeTransferRule:
+    """Flags a single transfer above a fixed token amount or a share of the wallet's balance."""
+    rule = 'LARGE_TRANSFER'
+
+    def __init__(self, min_amount, min_balance_share):
+        self.min_amount = min_amount
+        self.min_balance_share = min_balance_share
+
+    def evaluate(self, context, tx):
+        balance = context.wallet.balance / TOKEN_DECIMALS
+        share = tx.amount / balance if balance else None
+        if tx.amount < self.min_amount and (share is None or share < self.min_balance_share):
+            return None
+        share_text = f" ({share:.1%} of its balance)" if share is not None else ""
+        return Alert(
+            wallet=context.wallet,
+            transaction=tx,
+            rule=self.rule,
+            message=f"{context.wallet.address} made a {tx.transaction_type} of {tx.amount:,.2f} tokens{share_text}.",
+            data={'amount': tx.amount, 'balance_share': share},
+        )
+
+
+class NetOutflowRule:
+    """Flags a wallet whose net outflow over a sliding window crosses a threshold."""
+    rule = 'NET_OUTFLOW'
+
+    def __init__(self, threshold, window_seconds):
+        self.threshold = threshold
+        self.window_seconds = window_seconds
+
+    @staticmethod
+    def _flow(tx):
+        return tx.amount if tx.transaction_type == 'BUY' else -tx.amount
+
+    def prepare(self, context, transactions):
+        # Every BUY/SELL of the batch goes into the window in one round trip.
+        moves = [tx for tx in transactions if tx.transaction_type in ('BUY', 'SELL')]
+        totals = context.windows.add_many(
+            context.wallet.address,
+            [(tx.timestamp.timestamp(), tx.signature, self._flow(tx)) for tx in moves],
+            self.window_seconds,
+        )
+        context.window_totals = {tx.signature: total for tx, total in zip(moves, totals)}
+
+    def evaluate(self, context, tx):
+        if tx.signature not in context.window_totals:
+            return None
+        before, after = context.window_totals[tx.signature]
+        # Only alert when the window crosses the threshold, not on every event while it stays over.
+        if not (-before < self.threshold <= -after):
+            return None
+        return Alert(
+            wallet=context.wallet,
+            transaction=tx,
+            rule=self.rule,
+            message=(
+                f"{context.wallet.address} has a net outflow of {-after:,.2f} tokens "
+                f"over the last {self.window_seconds // 60} minutes."
+            ),
+            data={'net_outflow': -after, 'window_seconds': self.window_seconds},
+        )
+
+
+class NewProtocolRule:
+    """Flags the first time an already active wallet uses a protocol."""
+    rule = 'NEW_PROTOCOL'
+
+    def evaluate(self, context, tx):
+        if not tx.protocol or tx.protocol in context.known_protocols:
+            return None
+        is_first_activity = not context.known_protocols
+        context.known_protocols.add(tx.protocol)
+        if is_first_activity:
+            return None
+        return Alert(
+            wallet=context.wallet,
+            transaction=tx,
+            rule=self.rule,
+            message=f"{context.wallet.address} used {tx.protocol} for the first time.",
+            data={'protocol': tx.protocol},
+        )
+
+
+class BatchContext:
+    """State shared by the rules while one batch of a wallet's transactions is evaluated."""
+
+    def __init__(self, wallet, profile, windows):
+        self.wallet = wallet
+        self.windows = windows
+        self.known_protocols = set(profile.protocol_counts)
+        # (before, after) window totals per signature, filled in by NetOutflowRule.prepare.
+        self.window_totals = {}
+
+
+class AlertEngine:
+    """Evaluates alert rules against each batch of newly persisted transactions."""
+
+    def __init__(self, rules, windows, max_age_seconds):
+        self.rules = rules
+        self.windows = windows
+        self.max_age_seconds = max_age_seconds
+
+    def evaluate(self, wallet, profile, transactions):
+        """
+        Runs every rule over the new transactions in chronological order and stores the resulting alerts.
+        `profile` must be the wallet's profile as it was before this batch was applied.
+        A wallet's first batch is its backfilled history and raises no alerts, and neither do
+        transactions older than `max_age_seconds` (e.g. found late by a reconciliation poll).
+        """
+        if not profile.tx_count:
+            return []
+        context = BatchContext(wallet, profile, self.windows)
+        horizon = timezone.now() - timedelta(seconds=self.max_age_seconds)
+        fresh = []
+        for tx in sorted(transactions, key=lambda tx: tx.timestamp):
+            if tx.timestamp >= horizon:
+                fresh.append(tx)
+            elif tx.protocol:
+                # Protocols used by older transactions are not new to the fresh ones.
+                context.known_protocols.add(tx.protocol)
+        if not fresh:
+            return []
+
+        for rule in self.rules:
+            if hasattr(rule, 'prepare'):
+                rule.prepare(context, fresh)
+        alerts = []
+        for tx in fresh:
+            for rule in self.rules:
+                alert = rule.evaluate(context, tx)
+                if alert is not None:
+                    alerts.append(alert)
+        if alerts:
+            Alert.objects.bulk_create(alerts)
+        return alerts
+
+
+_engine = None
+
+
+def get_alert_engine():
+    """Returns the process-wide alert engine configured by ALERT_RULES and ALERT_WINDOW_BACKEND."""
+    global _engine
+    if _engine is None:
+        if settings.ALERT_WINDOW_BACKEND == 'redis':
+            windows = RedisWindowStore(get_redis_client(settings.ALERT_REDIS_URL))
+        else:
+            windows = MemoryWindowStore()
+
+        config = settings.ALERT_RULES
+        rules = []
+        if 'LARGE_TRANSFER' in config:
+            rules.append(LargeTransferRule(**config['LARGE_TRANSFER']))
+        if 'NET_OUTFLOW' in config:
+            rules.append(NetOutflowRule(**config['NET_OUTFLOW']))
+        if 'NEW_PROTOCOL' in config:
+            rules.append(NewProtocolRule(**config['NEW_PROTOCOL']))
+        _engine = AlertEngine(rules, windows, settings.ALERT_MAX_AGE_SECONDS)
+    return _engine
+
+
+def _reset_engine():
+    global _engine
+    _engine = None
+
+
+# The engine's window store holds a Redis client, whose sockets must not be shared with a forked child.
+os.register_at_fork(after_in_child=_reset_engine)
+
+
+@receiver(setting_changed)
+def _reset_engine_on_setting_change(setting, **kwargs):
+    # Rebuilds the engine when tests override its settings.
+    if setting.startswith('ALERT_'):
+        _reset_engine()
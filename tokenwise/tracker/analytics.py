@@ -0,0 +1,382 @@
+import json
+import os
+from datetime import date, datetime, time, timedelta, timezone
+from pathlib import Path
+from django.conf import settings
+from .models import Transaction, Wallet, SolanaMetric
+
+# Snapshots are written as hive-partitioned Parquet datasets under ANALYTICS_SNAPSHOT_DIR:
+#   transactions/dt=YYYY-MM-DD/part-0.parquet   one partition per completed UTC day
+#   wallets/dt=YYYY-MM-DD/part-0.parquet        daily snapshot of balances and profiles
+#   prices/dt=YYYY-MM-DD/part-0.parquet         SOL/USD price points per completed day
+# Wallet and price partitions are immutable once written, so each export only appends the
+# missing ones. Transactions can be stored long after they happened (backfills, webhook
+# redeliveries, late polls), so a transaction partition is rewritten whenever its day gained
+# rows since the previous export. transactions/_watermark.json records the ingestion time
+# the last export covered.
+
+PARTITION_FILE = 'part-0.parquet'
+ROWS_PER_BATCH = 50_000
+WATERMARK_FILE = '_watermark.json'
+# Rows are stamped before their transaction commits, so a row stamped just before the last
+# export may only have become visible after it. Changes this recent are looked at again.
+WATERMARK_OVERLAP = timedelta(minutes=10)
+
+
+class AnalyticsError(ValueError):
+    """Raised for unknown presets or invalid query parameters."""
+
+
+def _schemas():
+    import pyarrow as pa
+    timestamp = pa.timestamp('us', tz='UTC')
+    return {
+        'transactions': pa.schema([
+            ('signature', pa.string()),
+            ('wallet', pa.string()),
+            ('timestamp', timestamp),
+            ('transaction_type', pa.string()),
+            ('amount', pa.int64()),
+            ('protocol', pa.string()),
+        ]),
+        'wallets': pa.schema([
+            ('address', pa.string()),
+            ('owner', pa.string()),
+            ('balance', pa.int64()),
+            ('total_bought', pa.int64()),
+            ('total_sold', pa.int64()),
+            ('net_flow', pa.int64()),
+            ('tx_count', pa.int64()),
+            ('first_activity', timestamp),
+            ('last_activity', timestamp),
+        ]),
+        'prices': pa.schema([
+            ('timestamp', timestamp),
+            ('price', pa.float64()),
+        ]),
+    }
+
+
+def _partition_path(dataset, day):
+    return Path(settings.ANALYTICS_SNAPSHOT_DIR) / dataset / f'dt={day.isoformat()}' / PARTITION_FILE
+
+
+def _existing_days(dataset):
+    root = Path(settings.ANALYTICS_SNAPSHOT_DIR) / dataset
+    if not root.exists():
+        return set()
+    return {
+        date.fromisoformat(path.parent.name[len('dt='):])
+        for path in root.glob(f'dt=*/{PARTITION_FILE}')
+    }
+
+
+def _write_partition(dataset, day, rows):
+    """Streams `rows` (tuples in schema order) into a partition file in batches, then moves it into place."""
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _schemas()[dataset]
+    path = _partition_path(dataset, day)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    written = 0
+
+    with pq.ParquetWriter(tmp_path, schema, compression='zstd') as writer:
+        batch = []
+        for row in rows:
+            batch.append(row)
+            if len(batch) == ROWS_PER_BATCH:
+                writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in batch], schema=schema))
+                written += len(batch)
+                batch = []
+        if batch or not written:
+            writer.write_table(pa.Table.from_pylist([dict(zip(schema.names, r)) for r in batch], schema=schema))
+            written += len(batch)
+
+    # Readers never see a half-written partition.
+    os.replace(tmp_path, path)
+    return written
+
+
+def _day_bounds(day):
+    start = datetime.combine(day, time.min, tzinfo=timezone.utc)
+    return start, start + timedelta(days=1)
+
+
+def _watermark_path():
+    return Path(settings.ANALYTICS_SNAPSHOT_DIR) / 'transactions' / WATERMARK_FILE
+
+
+def _read_watermark():
+    path = _watermark_path()
+    if not path.exists():
+        return None
+    return datetime.fromisoformat(json.loads(path.read_text())['ingested_at'])
+
+
+def _write_watermark(ingested_at):
+    path = _watermark_path()
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_suffix('.tmp')
+    tmp_path.write_text(json.dumps({'ingested_at': ingested_at.isoformat()}))
+    os.replace(tmp_path, path)
+
+
+def _stale_transaction_days(today):
+    """Completed days without a partition, plus exported days that gained rows since the last export."""
+    first = Transaction.objects.order_by('timestamp').values_list('timestamp', flat=True).first()
+    if first is None:
+        return set()
+    existing = _existing_days('transactions')
+    day = first.astimezone(timezone.utc).date()
+    stale = set()
+    while day < today:
+        if day not in existing:
+            stale.add(day)
+        day += timedelta(days=1)
+
+    watermark = _read_watermark()
+    if existing and watermark is not None:
+        today_start, _ = _day_bounds(today)
+        late = Transaction.objects.filter(
+            ingested_at__gte=watermark - WATERMARK_OVERLAP, timestamp__lt=today_start
+        ).datetimes('timestamp', 'day', tzinfo=timezone.utc)
+        stale.update(moment.date() for moment in late)
+    elif existing:
+        # Partitions written before the watermark existed: rewrite them all once.
+        stale.update(day for day in existing if day < today)
+    return stale
+
+
+def export_transactions(today=None):
+    """
+    Writes a partition for every completed day that is not exported yet or gained rows since
+    the last export. Returns {day: row_count} for the partitions written.
+    """
+    today = today or datetime.now(timezone.utc).date()
+    # Taken before reading, so rows stored while the export runs are picked up next time.
+    started_at = datetime.now(timezone.utc)
+
+    exported = {}
+    for day in sorted(_stale_transaction_days(today)):
+        start, end = _day_bounds(day)
+        rows = (
+            Transaction.objects.filter(timestamp__gte=start, timestamp__lt=end)
+            .order_by('timestamp')
+            .values_list('signature', 'wallet_id', 'timestamp', 'transaction_type', 'amount', 'protocol')
+            .iterator(chunk_size=ROWS_PER_BATCH)
+        )
+        exported[day] = _write_partition('transactions', day, rows)
+    _write_watermark(started_at)
+    return exported
+
+
+def export_wallets(today=None):
+    """Writes today's wallet snapshot if it does not exist yet. Returns the row count, or None if skipped."""
+    today = today or datetime.now(timezone.utc).date()
+    if _partition_path('wallets', today).exists():
+        return None
+    rows = (
+        Wallet.objects.order_by('address')
+        .values_list(
+            'address', 'owner', 'balance',
+            'profile__total_bought', 'profile__total_sold', 'profile__net_flow', 'profile__tx_count',
+            'profile__first_activity', 'profile__last_activity',
+        )
+        .iterator(chunk_size=ROWS_PER_BATCH)
+    )
+    return _write_partition('wallets', today, rows)
+
+
+def export_prices(today=None):
+    """Writes the SOL/USD price points of every completed day not exported yet. Returns {day: row_count}."""
+    today = today or datetime.now(timezone.utc).date()
+    metric = SolanaMetric.objects.filter(name='solana_stats').first()
+    if metric is None:
+        return {}
+
+    by_day = {}
+    for timestamp_ms, price in metric.data.get('chart_data', []):
+        point = datetime.fromtimestamp(timestamp_ms / 1000, tz=timezone.utc)
+        by_day.setdefault(point.date(), []).append((point, price))
+
+    existing = _existing_days('prices')
+    return {
+        day: _write_partition('prices', day, points)
+        for day, points in sorted(by_day.items())
+        if day < today and day not in existing
+    }
+
+
+def export_snapshots(today=None):
+    """
+    Writes all missing or outdated snapshot partitions. Reads go to the primary: a lagging
+    replica could miss rows that are already behind the watermark.
+    """
+    return {
+        'transactions': export_transactions(today),
+        'wallets': export_wallets(today),
+        'prices': export_prices(today),
+    }
+
+
+# --- Preset analytical queries -----------------------------------------------
+
+def _parse_date(value):
+    if isinstance(value, date):
+        return value
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise AnalyticsError(f"Invalid date '{value}', expected YYYY-MM-DD.")
+
+
+def _parse_limit(value):
+    try:
+        limit = int(value)
+    except (TypeError, ValueError):
+        raise AnalyticsError(f"Invalid limit '{value}'.")
+    if not 1 <= limit <= 1000:
+        raise AnalyticsError("limit must be between 1 and 1000.")
+    return limit
+
+
+def _parse_bucket(value):
+    if value not in ('day', 'week', 'month'):
+        raise AnalyticsError("bucket must be one of: day, week, month.")
+    return value
+
+
+PARAMETERS = {
+    'start': (_parse_date, lambda: datetime.now(timezone.utc).date() - timedelta(days=90)),
+    'end': (_parse_date, lambda: datetime.now(timezone.utc).date()),
+    'limit': (_parse_limit, lambda: 20),
+    'bucket': (_parse_bucket, lambda: 'week'),
+}
+
+PRESETS = {
+    'volume_by_protocol': {
+        'description': 'Transaction count and volume per protocol and time bucket.',
+        'params': ('start', 'end', 'bucket'),
+        'sql': """
+            SELECT date_trunc($bucket, timestamp) AS period, protocol,
+                   count(*) AS transactions, sum(amount) AS volume
+            FROM transactions
+            WHERE dt BETWEEN $start AND $end
+            GROUP BY ALL
+            ORDER BY period, volume DESC
+        """,
+    },
+    'buy_sell_ratio': {
+        'description': 'Buy and sell volume and their ratio per time bucket.',
+        'params': ('start', 'end', 'bucket'),
+        'sql': """
+            SELECT date_trunc($bucket, timestamp) AS period,
+                   sum(amount) FILTER (WHERE transaction_type = 'BUY') AS buy_volume,
+                   sum(amount) FILTER (WHERE transaction_type = 'SELL') AS sell_volume,
+                   buy_volume / nullif(sell_volume, 0) AS buy_sell_ratio
+            FROM transactions
+            WHERE dt BETWEEN $start AND $end
+            GROUP BY ALL
+            ORDER BY period
+        """,
+    },
+    'holder_cohorts': {
+        'description': 'Net flow per week of wallets grouped by the week they were first active.',
+        'params': ('start', 'end'),
+        'sql': """
+            WITH activity AS (
+                SELECT wallet, date_trunc('week', timestamp) AS week,
+                       CASE transaction_type WHEN 'BUY' THEN amount WHEN 'SELL' THEN -amount ELSE 0 END AS flow
+                FROM transactions
+                WHERE dt BETWEEN $start AND $end
+            ),
+            cohorts AS (
+                SELECT wallet, min(week) AS cohort FROM activity GROUP BY wallet
+            )
+            SELECT cohort, week, count(DISTINCT wallet) AS active_wallets, sum(flow) AS net_flow
+            FROM activity JOIN cohorts USING (wallet)
+            GROUP BY ALL
+            ORDER BY cohort, week
+        """,
+    },
+    'top_net_buyers': {
+        'description': 'Wallets with the largest net inflow over a window.',
+        'params': ('start', 'end', 'limit'),
+        'sql': """
+            SELECT wallet,
+                   sum(CASE transaction_type WHEN 'BUY' THEN amount WHEN 'SELL' THEN -amount ELSE 0 END) AS net_flow,
+                   count(*) AS transactions
+            FROM transactions
+            WHERE dt BETWEEN $start AND $end
+            GROUP BY wallet
+            ORDER BY net_flow DESC
+            LIMIT $limit
+        """,
+    },
+    'daily_volume_vs_price': {
+        'description': 'Daily token volume next to the average SOL/USD price.',
+        'params': ('start', 'end'),
+        'sql': """
+            WITH volume AS (
+                SELECT dt, sum(amount) AS volume, count(*) AS transactions
+                FROM transactions WHERE dt BETWEEN $start AND $end GROUP BY dt
+            ),
+            price AS (
+                SELECT dt, avg(price) AS avg_price
+                FROM prices WHERE dt BETWEEN $start AND $end GROUP BY dt
+            )
+            SELECT dt AS day, volume, transactions, avg_price
+            FROM volume FULL OUTER JOIN price USING (dt)
+            ORDER BY day
+        """,
+    },
+}
+
+
+def run_preset(name, params=None):
+    """
+    Runs a preset analytical query over the Parquet snapshots with an embedded DuckDB.
+    Returns a dict with the column names and rows. The OLTP database is not touched.
+    """
+    import duckdb
+
+    preset = PRESETS.get(name)
+    if preset is None:
+        raise AnalyticsError(f"Unknown preset '{name}'. Choose from: {', '.join(PRESETS)}.")
+
+    params = params or {}
+    values = {}
+    for param in preset['params']:
+        parse, default = PARAMETERS[param]
+        values[param] = parse(params[param]) if params.get(param) not in (None, '') else default()
+
+    connection = duckdb.connect()
+    try:
+        root = Path(settings.ANALYTICS_SNAPSHOT_DIR)
+        for dataset, schema in _schemas().items():
+            if _existing_days(dataset):
+                source = f"read_parquet('{root / dataset}/dt=*/*.parquet', hive_partitioning = true, hive_types = {{'dt': DATE}})"
+            else:
+                # No snapshot yet: expose an empty relation with the right columns.
+                columns = ', '.join(f'NULL::{_duckdb_type(field.type)} AS {field.name}' for field in schema)
+                source = f"(SELECT {columns}, NULL::DATE AS dt WHERE false)"
+            connection.execute(f"CREATE VIEW {dataset} AS SELECT * FROM {source}")
+
+        result = connection.execute(preset['sql'], values)
+        columns = [column[0] for column in result.description]
+        return {'preset': name, 'params': values, 'columns': columns, 'rows': result.fetchall()}
+    finally:
+        connection.close()
+
+
+def _duckdb_type(arrow_type):
+    import pyarrow as pa
+    if pa.types.is_timestamp(arrow_type):
+        return 'TIMESTAMPTZ'
+    if pa.types.is_integer(arrow_type):
+        return 'BIGINT'
+    if pa.types.is_floating(arrow_type):
+        return 'DOUBLE'
+    return 'VARCHAR'
@@ -0,0 +1,65 @@
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+
+# Provider clients shared by everything in the process. They are created on first use,
+# so heavy SDK imports (pycoingecko, redis) stay off the web process import path, and
+# then reused so each Celery tick does not pay client construction and connection setup.
+_clients = {}
+_lock = threading.Lock()
+
+
+def _get_or_create(name, factory):
+    client = _clients.get(name)
+    if client is None:
+        with _lock:
+            client = _clients.get(name)
+            if client is None:
+                client = _clients[name] = factory()
+    return client
+
+
+# Sockets must not be shared between a forked child (e.g. a Celery prefork worker) and its parent.
+os.register_at_fork(after_in_child=_clients.clear)
+
+
+def get_http_session():
+    """A pooled requests session for Helius and JSON-RPC calls."""
+    def factory():
+        session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=16, max_retries=2)
+        session.mount('https://', adapter)
+        session.mount('http://', adapter)
+        return session
+    return _get_or_create('http', factory)
+
+
+def get_solana_rpc():
+    """The JSON-RPC transport used for holder discovery and owner resolution."""
+    def factory():
+        from .rpc import SolanaRpc
+        return SolanaRpc(session=get_http_session())
+    return _get_or_create('solana_rpc', factory)
+
+
+def get_coingecko_client():
+    """The CoinGecko API client."""
+    def factory():
+        from pycoingecko import CoinGeckoAPI
+        return CoinGeckoAPI()
+    return _get_or_create('coingecko', factory)
+
+
+def get_redis_client(url, **options):
+    """
+    A Redis client for `url`, with `options` (e.g. socket_timeout) passed to redis.Redis.
+    Clients are connection pools and safe to share between threads.
+    """
+    def factory():
+        import redis
+        return redis.Redis.from_url(url, **options)
+    name = f'redis:{url}'
+    if options:
+        name += ':' + ','.join(f'{key}={value}' for key, value in sorted(options.items()))
+    return _get_or_create(name, factory)
@@ -0,0 +1,115 @@
+import base64
+import heapq
+from dataclasses import dataclass
+from django.conf import settings
+from .rpc import SolanaRpc, b58encode
+
+SPL_TOKEN_PROGRAM_ID = 'TokenkegQfeZyiNwAJbNbGKPFXCWuBvf9Ss623VQ5DA'
+
+# Layout of an SPL token account: mint (32) | owner (32) | amount (u64, little endian) | ...
+TOKEN_ACCOUNT_SIZE = 165
+OWNER_OFFSET = 32
+AMOUNT_OFFSET = 64
+
+
+@dataclass(frozen=True)
+class TokenHolder:
+    """A token account holding the target token, together with the wallet that owns it."""
+    address: str
+    owner: str
+    amount: int
+
+
+class ProgramAccountsSource:
+    """
+    Enumerates every token account for a mint with getProgramAccounts.
+    Only the owner and amount are requested (via dataSlice) and the response is
+    decoded as it streams in, so memory use does not grow with the number of accounts.
+    """
+
+    def __init__(self, rpc, mint, program_id=SPL_TOKEN_PROGRAM_ID):
+        self.rpc = rpc
+        self.mint = mint
+        self.program_id = program_id
+
+    def __iter__(self):
+        params = [
+            self.program_id,
+            {
+                "encoding": "base64",
+                "dataSlice": {"offset": OWNER_OFFSET, "length": AMOUNT_OFFSET + 8 - OWNER_OFFSET},
+                "filters": [
+                    {"dataSize": TOKEN_ACCOUNT_SIZE},
+                    {"memcmp": {"offset": 0, "bytes": self.mint}},
+                ],
+            },
+        ]
+        for item in self.rpc.stream_result_items('getProgramAccounts', params):
+            raw = base64.b64decode(item['account']['data'][0])
+            # The owner is left as raw bytes; only the final top-N are base58 encoded.
+            yield item['pubkey'], raw[:32], int.from_bytes(raw[32:40], 'little')
+
+
+class HeliusTokenAccountsSource:
+    """Pages through every token account for a mint with Helius' getTokenAccounts DAS method."""
+    page_size = 1000
+
+    def __init__(self, rpc, mint):
+        self.rpc = rpc
+        self.mint = mint
+
+    def __iter__(self):
+        page = 1
+        while True:
+            result = self.rpc.call('getTokenAccounts', {
+                'mint': self.mint,
+                'page': page,
+                'limit': self.page_size,
+            })
+            accounts = (result or {}).get('token_accounts') or []
+            for account in accounts:
+                yield account['address'], account.get('owner'), int(account.get('amount') or 0)
+            if len(accounts) < self.page_size:
+                return
+            page += 1
+
+
+HOLDER_SOURCES = {
+    'helius': HeliusTokenAccountsSource,
+    'program-accounts': ProgramAccountsSource,
+}
+
+
+def get_holder_source(rpc=None, mint=None, source=None):
+    """Builds the token-account source configured by HOLDER_DISCOVERY_SOURCE."""
+    source = source or settings.HOLDER_DISCOVERY_SOURCE
+    try:
+        source_class = HOLDER_SOURCES[source]
+    except KeyError:
+        raise ValueError(f"Unknown holder discovery source '{source}'. Choose from: {', '.join(HOLDER_SOURCES)}.")
+    return source_class(rpc or SolanaRpc(), mint or settings.TARGET_TOKEN_MINT_ADDRESS)
+
+
+def rank_top_holders(accounts, limit):
+    """
+    Returns the `limit` largest token accounts, biggest first.
+    `accounts` is any iterable of (address, owner, amount) tuples; a min-heap of
+    size `limit` keeps the scan at O(n log limit) time and O(limit) memory.
+    """
+    heap = []
+    for address, owner, amount in accounts:
+        if amount <= 0:
+            continue
+        if len(heap) < limit:
+            heapq.heappush(heap, (amount, address, owner))
+        elif amount > heap[0][0]:
+            heapq.heapreplace(heap, (amount, address, owner))
+
+    return [
+        TokenHolder(
+            address=address,
+            owner=owner if isinstance(owner, str) or owner is None else b58encode(owner),
+            amount=amount,
+        )
+        for amount, address, owner in sorted(heap, reverse=True)
+    ]
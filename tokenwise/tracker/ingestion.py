@@ -0,0 +1,61 @@
+from django.db import IntegrityError, transaction
+from .alerts import get_alert_engine
+from .models import Transaction, WalletProfile
+
+
+def _insert_new_transactions(transactions):
+    """Inserts the transactions whose signatures are not stored yet. Returns the inserted ones."""
+    # Deduplicate by signature, both within the batch and against stored rows.
+    batch = {tx.signature: tx for tx in transactions}
+    for attempt in range(2):
+        existing = set(
+            Transaction.objects.filter(signature__in=batch).values_list('signature', flat=True)
+        )
+        new_transactions = [tx for signature, tx in batch.items() if signature not in existing]
+        if not new_transactions:
+            return []
+        try:
+            with transaction.atomic():
+                Transaction.objects.bulk_create(new_transactions)
+            return new_transactions
+        except IntegrityError:
+            # The profile lock only serialises one wallet. A transaction moving tokens between
+            # two tracked wallets can be stored for the other wallet between the check and the
+            # insert; the savepoint is rolled back and the check repeated once.
+            if attempt:
+                raise
+
+
+def persist_wallet_transactions(wallet, transactions):
+    """
+    Stores a batch of unsaved Transaction objects for a wallet, evaluates the alert rules
+    against them and folds them into its WalletProfile, all in one database transaction.
+    Signatures that are already stored are skipped. Returns the transactions that were inserted.
+    """
+    if not transactions:
+        return []
+
+    with transaction.atomic():
+        # Locking the profile row serialises concurrent ingestion for the same wallet,
+        # so the duplicate check and the profile deltas stay consistent.
+        WalletProfile.objects.get_or_create(wallet=wallet)
+        profile = WalletProfile.objects.select_for_update().get(wallet=wallet)
+
+        new_transactions = _insert_new_transactions(transactions)
+        if not new_transactions:
+            return []
+
+        # Rules see the profile as it was before this batch (e.g. which protocols were already used).
+        get_alert_engine().evaluate(wallet, profile, new_transactions)
+        profile.apply_transactions(new_transactions)
+        profile.save()
+
+    return new_transactions
+
+
+def ensure_wallet_profiles(wallets):
+    """Creates empty profiles for wallets that have none yet, so every wallet sorts on real values."""
+    WalletProfile.objects.bulk_create(
+        [WalletProfile(wallet=wallet) for wallet in wallets],
+        ignore_conflicts=True,
+    )
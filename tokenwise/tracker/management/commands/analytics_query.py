@@ -0,0 +1,24 @@
+from django.core.management.base import BaseCommand, CommandError
+from tracker.analytics import PRESETS, AnalyticsError, run_preset
+
+class Command(BaseCommand):
+    help = 'Runs a preset analytical query over the Parquet snapshots with DuckDB.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('preset', choices=sorted(PRESETS), help='Preset query to run.')
+        parser.add_argument('--start', help='First day (YYYY-MM-DD).')
+        parser.add_argument('--end', help='Last day (YYYY-MM-DD).')
+        parser.add_argument('--bucket', help='Time bucket: day, week or month.')
+        parser.add_argument('--limit', help='Maximum number of rows, for ranking presets.')
+
+    def handle(self, *args, **options):
+        params = {name: options[name] for name in ('start', 'end', 'bucket', 'limit')}
+        try:
+            result = run_preset(options['preset'], params)
+        except AnalyticsError as e:
+            raise CommandError(str(e))
+
+        self.stdout.write(self.style.HTTP_INFO('\t'.join(result['columns'])))
+        for row in result['rows']:
+            self.stdout.write('\t'.join('' if value is None else str(value) for value in row))
+        self.stdout.write(self.style.SUCCESS(f"{len(result['rows'])} rows."))
@@ -0,0 +1,67 @@
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+import requests
+from django.core.management.base import BaseCommand
+
+DEFAULT_PATHS = [
+    '/api/dashboard-metrics/',
+    '/api/solana-stats/',
+    '/api/wallets/',
+    '/api/transactions/',
+    '/api/historical-transactions/',
+]
+
+
+class Command(BaseCommand):
+    help = (
+        'Load-tests the read endpoints of a WSGI and an ASGI deployment side by side. '
+        'Start both with the same worker count first, e.g. '
+        '`gunicorn tokenwise.wsgi -w 4 -b :8000` and '
+        '`uvicorn tokenwise.asgi:application --workers 4 --port 8001`.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--wsgi-url', default='http://localhost:8000', help='Base URL of the WSGI deployment.')
+        parser.add_argument('--asgi-url', default='http://localhost:8001', help='Base URL of the ASGI deployment.')
+        parser.add_argument('--concurrency', type=int, default=64, help='Number of concurrent clients.')
+        parser.add_argument('--requests', type=int, default=1000, help='Requests per deployment.')
+        parser.add_argument('--path', action='append', dest='paths', help='Endpoint to hit (repeatable).')
+
+    def handle(self, *args, **options):
+        paths = options['paths'] or DEFAULT_PATHS
+        for label, base_url in (('WSGI', options['wsgi_url']), ('ASGI', options['asgi_url'])):
+            self.stdout.write(self.style.HTTP_INFO(
+                f'{label} ({base_url}): {options["requests"]} requests, concurrency {options["concurrency"]}'
+            ))
+            self._report(*self._run(base_url, paths, options['requests'], options['concurrency']))
+
+    def _run(self, base_url, paths, total, concurrency):
+        local = threading.local()
+
+        def fetch(i):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            started = time.perf_counter()
+            try:
+                ok = session.get(base_url + paths[i % len(paths)], timeout=60).status_code < 400
+            except requests.exceptions.RequestException:
+                ok = False
+            return time.perf_counter() - started, ok
+
+        started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=concurrency) as pool:
+            results = list(pool.map(fetch, range(total)))
+        return results, time.perf_counter() - started
+
+    def _report(self, results, elapsed):
+        latencies = sorted(latency for latency, _ in results)
+        errors = sum(1 for _, ok in results if not ok)
+        self.stdout.write(
+            f'  throughput: {len(results) / elapsed:8.1f} req/s\n'
+            f'  latency p50: {statistics.median(latencies) * 1000:8.1f} ms\n'
+            f'  latency p95: {latencies[int(len(latencies) * 0.95) - 1] * 1000:8.1f} ms\n'
+            f'  errors: {errors}'
+        )
@@ -0,0 +1,95 @@
+import time
+from datetime import datetime, timedelta, timezone
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from django.utils.text import compress_string
+from rest_framework.renderers import JSONRenderer
+from tracker.models import Transaction
+from tracker.renderers import ColumnarJSONRenderer, MessagePackRenderer, ORJSONRenderer
+from tracker.serializers import TransactionSerializer
+
+RENDERERS = {
+    'drf json (before)': JSONRenderer,
+    'orjson': ORJSONRenderer,
+    'orjson columnar': ColumnarJSONRenderer,
+    'msgpack': MessagePackRenderer,
+}
+
+
+def _brotli(content):
+    import brotli
+    return brotli.compress(content, quality=settings.BROTLI_QUALITY)
+
+
+ENCODINGS = {
+    'identity': lambda content: content,
+    'gzip': compress_string,
+    'br': _brotli,
+}
+
+
+def _synthetic_page(size):
+    """Unsaved transactions shaped like real ones, for an empty database."""
+    now = datetime.now(timezone.utc)
+    protocols = ['JUPITER', 'RAYDIUM', 'ORCA', 'PUMP_FUN']
+    return [
+        Transaction(
+            signature=f'{i:088d}',
+            wallet_id=f'{i % 20:044d}',
+            timestamp=now - timedelta(minutes=i),
+            description=f'{i % 20:044d} swapped {1000 + i * 37} tokens for {i / 10:.2f} SOL',
+            transaction_type='BUY' if i % 3 else 'SELL',
+            amount=1000 + i * 37,
+            protocol=protocols[i % len(protocols)],
+        )
+        for i in range(size)
+    ]
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures bytes on the wire and CPU per /transactions/ page for each renderer and '
+        'content encoding, against DRF\'s JSONRenderer without compression.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--page-size', type=int, default=100, help='Rows per page.')
+        parser.add_argument('--repeat', type=int, default=200, help='Renders per measurement.')
+        parser.add_argument('--synthetic', action='store_true', help='Use generated rows instead of the database.')
+
+    def handle(self, *args, **options):
+        size = options['page_size']
+        repeat = options['repeat']
+
+        rows = [] if options['synthetic'] else list(Transaction.objects.defer('search_vector').order_by('-timestamp')[:size])
+        if len(rows) < size:
+            self.stdout.write(self.style.WARNING(f'{len(rows)} stored transactions, using {size} generated rows.'))
+            rows = _synthetic_page(size)
+        else:
+            with CaptureQueriesContext(connection) as queries:
+                TransactionSerializer(rows, many=True).data
+            self.stdout.write(f'Serializing the page ran {len(queries)} queries.')
+
+        started = time.process_time()
+        for _ in range(repeat):
+            results = TransactionSerializer(rows, many=True).data
+        serialize_ms = (time.process_time() - started) / repeat * 1000
+        self.stdout.write(f'Serializer: {serialize_ms:.2f} ms CPU per page (same for every renderer).\n')
+
+        page = {'count': 10_000, 'next': 'http://localhost:8000/api/transactions/?page=2', 'previous': None, 'results': results}
+        self.stdout.write(self.style.HTTP_INFO(f'{"renderer":20} {"encoding":9} {"bytes":>9} {"CPU ms":>8}'))
+        baseline = None
+        for renderer_name, renderer_class in RENDERERS.items():
+            renderer = renderer_class()
+            for encoding, encode in ENCODINGS.items():
+                started = time.process_time()
+                for _ in range(repeat):
+                    body = encode(renderer.render(page))
+                cpu_ms = (time.process_time() - started) / repeat * 1000
+                baseline = baseline or (len(body), cpu_ms)
+                self.stdout.write(
+                    f'{renderer_name:20} {encoding:9} {len(body):9,} {cpu_ms:8.3f}'
+                    f'   ({len(body) / baseline[0]:5.1%} bytes, {cpu_ms / baseline[1]:5.1%} CPU)'
+                )
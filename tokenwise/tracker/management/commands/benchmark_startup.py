@@ -0,0 +1,57 @@
+import statistics
+import subprocess
+import sys
+import time
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+HEAVY_MODULES = ('solana', 'solders', 'pycoingecko')
+
+# Each scenario runs in a fresh interpreter, the way the real process starts.
+SCENARIOS = {
+    'manage.py': [sys.executable, 'manage.py', 'check'],
+    # What a gunicorn worker does on boot: load the WSGI app, then the URLconf on first request.
+    'gunicorn worker': [sys.executable, '-c', (
+        'import tokenwise.wsgi\n'
+        'from django.urls import get_resolver\n'
+        'get_resolver().url_patterns\n'
+    )],
+    # What a Celery worker does on boot: configure the app and import every task module.
+    'celery worker': [sys.executable, '-c', (
+        'from tokenwise.celery import app\n'
+        'app.loader.import_default_modules()\n'
+    )],
+}
+
+
+class Command(BaseCommand):
+    help = (
+        'Measures cold start time of manage.py, a gunicorn worker and a Celery worker, '
+        'and checks that heavy provider SDKs stay off the web import path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=5, help='Runs per scenario.')
+
+    def handle(self, *args, **options):
+        cwd = settings.BASE_DIR
+        for name, command in SCENARIOS.items():
+            timings = []
+            for _ in range(options['repeat']):
+                started = time.perf_counter()
+                subprocess.run(command, cwd=cwd, check=True, capture_output=True)
+                timings.append(time.perf_counter() - started)
+            self.stdout.write(
+                f'{name:16} median {statistics.median(timings) * 1000:7.0f} ms   '
+                f'min {min(timings) * 1000:7.0f} ms'
+            )
+
+        probe = SCENARIOS['gunicorn worker'][:2] + [
+            SCENARIOS['gunicorn worker'][2]
+            + f'import sys\nprint(",".join(m for m in {HEAVY_MODULES!r} if m in sys.modules))\n'
+        ]
+        loaded = subprocess.run(probe, cwd=cwd, check=True, capture_output=True, text=True).stdout.strip()
+        if loaded:
+            self.stdout.write(self.style.WARNING(f'Heavy SDKs imported by the web process: {loaded}'))
+        else:
+            self.stdout.write(self.style.SUCCESS('No heavy SDKs imported by the web process.'))
@@ -0,0 +1,37 @@
+import time
+from django.core.management.base import BaseCommand
+from tracker.services import get_solana_service
+from tracker.webhooks import consume_webhook_batch
+
+# Pause after a failed micro-batch (e.g. Redis or the database restarting) before trying again.
+ERROR_BACKOFF_SECONDS = 5
+
+class Command(BaseCommand):
+    help = 'Continuously stores the transactions queued by the Helius webhook receiver, in micro-batches.'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, help='Deliveries per micro-batch (default: WEBHOOK_BATCH_SIZE).')
+        parser.add_argument('--block-ms', type=int, default=5000, help='How long to wait for new deliveries.')
+        parser.add_argument('--once', action='store_true', help='Process a single micro-batch and exit.')
+
+    def handle(self, *args, **options):
+        service = get_solana_service()
+        self.stdout.write(self.style.SUCCESS('Consuming webhook deliveries...'))
+        while True:
+            try:
+                entries, stored = consume_webhook_batch(
+                    service, batch_size=options['batch_size'], block_ms=options['block_ms']
+                )
+            except Exception as e:
+                if options['once']:
+                    raise
+                # Unacknowledged entries stay pending and are reclaimed once the consumer recovers.
+                self.stderr.write(self.style.ERROR(f'Micro-batch failed: {e!r}. Retrying in {ERROR_BACKOFF_SECONDS}s.'))
+                time.sleep(ERROR_BACKOFF_SECONDS)
+                continue
+            if entries:
+                self.stdout.write(
+                    f'{entries} deliveries: {sum(stored.values())} new transactions for {len(stored)} wallets.'
+                )
+            if options['once']:
+                break
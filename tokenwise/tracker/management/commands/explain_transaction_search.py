@@ -0,0 +1,37 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+from django.http import QueryDict
+from rest_framework.exceptions import ValidationError
+from tracker.views import transaction_queryset
+
+class Command(BaseCommand):
+    help = (
+        'Prints the query plans of a /transactions/ request: the first page and the capped count. '
+        'Use it to check that a search or filter is served by an index.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            'query', nargs='?', default='',
+            help="Query string of the request, e.g. 'q=swapped -jupiter&protocol=RAYDIUM'.",
+        )
+        parser.add_argument('--page-size', type=int, default=10, help='Rows per page.')
+        parser.add_argument('--analyze', action='store_true', help='Run the queries and show actual timings (EXPLAIN ANALYZE).')
+
+    def handle(self, *args, **options):
+        try:
+            queryset = transaction_queryset(QueryDict(options['query']))
+        except ValidationError as e:
+            raise CommandError('; '.join(f'{name}: {message}' for name, message in e.detail.items()))
+
+        explain = {'analyze': True, 'buffers': True} if options['analyze'] else {}
+        cap = settings.TRANSACTION_COUNT_CAP
+        plans = (
+            ('page', queryset[:options['page_size']]),
+            # The paginator runs COUNT(*) over this query, so it stops after TRANSACTION_COUNT_CAP + 1 rows.
+            (f'count (capped at {cap})', queryset[:cap + 1].values('pk')),
+        )
+        for name, plan_queryset in plans:
+            self.stdout.write(self.style.HTTP_INFO(f'-- {name}'))
+            self.stdout.write(plan_queryset.explain(**explain))
+            self.stdout.write('')
@@ -0,0 +1,20 @@
+from django.core.management.base import BaseCommand
+from tracker.analytics import export_snapshots
+
+class Command(BaseCommand):
+    help = 'Writes the missing or outdated date-partitioned Parquet snapshots of transactions, wallets and prices.'
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Exporting analytics snapshots...'))
+        result = export_snapshots()
+
+        for dataset in ('transactions', 'prices'):
+            partitions = result[dataset]
+            rows = sum(partitions.values())
+            self.stdout.write(f'{dataset}: {len(partitions)} partitions written, {rows} rows.')
+        if result['wallets'] is None:
+            self.stdout.write("wallets: today's snapshot already exists.")
+        else:
+            self.stdout.write(f"wallets: {result['wallets']} rows.")
+
+        self.stdout.write(self.style.SUCCESS('Snapshot export complete.'))
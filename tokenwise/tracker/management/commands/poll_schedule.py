@@ -0,0 +1,29 @@
+from django.core.management.base import BaseCommand
+from django.db.models import Count, Min
+from django.utils import timezone
+from tracker.models import WalletPollState
+from tracker.scheduler import ensure_poll_states, estimated_polls_per_hour
+
+class Command(BaseCommand):
+    help = 'Shows the adaptive polling schedule: wallets per interval, due wallets and provider calls per hour.'
+
+    def handle(self, *args, **options):
+        ensure_poll_states()
+        now = timezone.now()
+
+        self.stdout.write(self.style.HTTP_INFO(f'{"interval":>10} {"wallets":>8} {"next due in":>12}'))
+        buckets = (
+            WalletPollState.objects.values('interval_seconds')
+            .annotate(wallets=Count('wallet'), next_due=Min('next_poll_at'))
+            .order_by('interval_seconds')
+        )
+        for bucket in buckets:
+            due_in = max((bucket['next_due'] - now).total_seconds(), 0)
+            self.stdout.write(f'{bucket["interval_seconds"]:>9}s {bucket["wallets"]:>8} {due_in:>11.0f}s')
+
+        due = WalletPollState.objects.filter(next_poll_at__lte=now).count()
+        adaptive, flat = estimated_polls_per_hour()
+        self.stdout.write(f'{due} wallets due now.')
+        self.stdout.write(self.style.SUCCESS(
+            f'~{adaptive:.0f} provider calls per hour (a flat 5-minute poll would make {flat}).'
+        ))
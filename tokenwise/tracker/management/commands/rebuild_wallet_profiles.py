@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from tracker.models import Wallet, WalletProfile
+
+
+class Command(BaseCommand):
+    help = (
+        'Rebuilds every WalletProfile from the stored transactions. '
+        'Only needed once for data ingested before profiles existed; '
+        'ingestion keeps profiles up to date incrementally afterwards.'
+    )
+
+    def handle(self, *args, **options):
+        self.stdout.write(self.style.SUCCESS('Rebuilding wallet profiles...'))
+        wallets = Wallet.objects.all()
+        total_wallets = wallets.count()
+
+        for i, wallet in enumerate(wallets.iterator()):
+            with transaction.atomic():
+                profile = WalletProfile(wallet=wallet)
+                profile.apply_transactions(wallet.transactions.order_by('timestamp').iterator())
+                profile.save()
+            if (i + 1) % 100 == 0:
+                self.stdout.write(f'Rebuilt {i + 1}/{total_wallets} profiles...')
+
+        self.stdout.write(self.style.SUCCESS(f'Rebuilt {total_wallets} wallet profiles.'))
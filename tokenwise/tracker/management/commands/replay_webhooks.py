@@ -0,0 +1,50 @@
+import json
+from pathlib import Path
+from django.core.management.base import BaseCommand, CommandError
+from tracker.services import get_solana_service, ingest_enhanced_transactions
+from tracker.webhooks import enqueue_payload, parse_payload
+
+class Command(BaseCommand):
+    help = (
+        'Replays recorded Helius webhook payloads (JSON files holding an array of enhanced '
+        'transactions) through the ingestion path.'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('paths', nargs='+', help='Payload files, or directories of *.json payloads.')
+        parser.add_argument(
+            '--stream', action='store_true',
+            help='Enqueue the payloads on the webhook stream for the consumer instead of storing them directly.',
+        )
+
+    def handle(self, *args, **options):
+        files = []
+        for path in map(Path, options['paths']):
+            if path.is_dir():
+                files.extend(sorted(path.glob('*.json')))
+            elif path.exists():
+                files.append(path)
+            else:
+                raise CommandError(f'{path} does not exist.')
+
+        service = get_solana_service()
+        for path in files:
+            body = path.read_bytes()
+            try:
+                transactions, rejected = parse_payload(body)
+            except ValueError as e:
+                raise CommandError(f'{path}: {e}')
+            if rejected:
+                self.stdout.write(self.style.WARNING(f'{path.name}: skipped {rejected} invalid transactions.'))
+
+            if options['stream']:
+                entry_id = enqueue_payload(json.dumps(transactions))
+                self.stdout.write(f'{path.name}: {len(transactions)} transactions enqueued as {entry_id.decode()}.')
+            else:
+                stored = ingest_enhanced_transactions(service, transactions)
+                self.stdout.write(
+                    f'{path.name}: {len(transactions)} transactions, '
+                    f'{sum(stored.values())} new for {len(stored)} wallets.'
+                )
+
+        self.stdout.write(self.style.SUCCESS(f'Replayed {len(files)} payload files.'))
@@ -0,0 +1,116 @@
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.middleware.gzip import GZipMiddleware
+from django.utils.cache import patch_vary_headers
+from django.utils.regex_helper import _lazy_re_compile
+from .renderers import API_RENDERERS
+from .routers import PRIMARY_DB, choose_replica, pin_check_due, reads_pinned_to_primary, reset_read_route, route_reads_to
+
+SAFE_METHODS = ('GET', 'HEAD', 'OPTIONS')
+# Only the API's read endpoints are served from replicas. The admin, sessions and auth
+# always read from the primary, so e.g. the redirect after a login sees the new session.
+REPLICA_PATH_PREFIX = '/api/'
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Serves read-only API requests (safe methods under REPLICA_PATH_PREFIX) from a read replica.
+    For REPLICA_STICKY_SECONDS after a data refresh finishes, reads stay on the primary so
+    clients do not see stale data while replicas catch up (see routers.pin_reads_to_primary).
+    Works for both the sync DRF views and the async read views.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = route_reads_to(self._read_alias(request))
+        try:
+            return self.get_response(request)
+        finally:
+            reset_read_route(token)
+
+    async def __acall__(self, request):
+        alias = PRIMARY_DB
+        if self._replica_eligible(request):
+            # The pin check hits Redis at most once per PRIMARY_PIN_CHECK_SECONDS per process,
+            # and then off the event loop.
+            if pin_check_due():
+                pinned = await sync_to_async(reads_pinned_to_primary)()
+            else:
+                pinned = reads_pinned_to_primary()
+            if not pinned:
+                alias = choose_replica()
+        token = route_reads_to(alias)
+        try:
+            return await self.get_response(request)
+        finally:
+            reset_read_route(token)
+
+    @staticmethod
+    def _replica_eligible(request):
+        return (
+            request.method in SAFE_METHODS
+            and request.path.startswith(REPLICA_PATH_PREFIX)
+            and bool(settings.DATABASE_REPLICAS)
+        )
+
+    def _read_alias(self, request):
+        if not self._replica_eligible(request) or reads_pinned_to_primary():
+            return PRIMARY_DB
+        # One replica per request keeps counts and pages consistent with each other.
+        return choose_replica()
+
+
+_accepts_brotli = _lazy_re_compile(r"\bbr\b")
+
+
+class CompressionMiddleware(GZipMiddleware):
+    """
+    Compresses API responses with Brotli when the client accepts it and the `brotli` package
+    is installed. Everything else, including streaming responses, goes through GZipMiddleware.
+    """
+    # Bodies smaller than this are not worth the CPU or the extra headers.
+    min_length = 200
+    # Only the API formats get Brotli. HTML pages (admin, browsable API) carry CSRF tokens and
+    # reflect the query string, so they keep GZipMiddleware's BREACH mitigation.
+    brotli_media_types = frozenset(renderer.media_type for renderer in API_RENDERERS)
+
+    def process_response(self, request, response):
+        try:
+            import brotli
+        except ImportError:
+            brotli = None
+
+        ae = request.META.get("HTTP_ACCEPT_ENCODING", "")
+        if (
+            brotli is None
+            or response.streaming
+            or response.has_header("Content-Encoding")
+            or not _accepts_brotli.search(ae)
+            or response.get("Content-Type", "").split(";")[0].strip() not in self.brotli_media_types
+        ):
+            return super().process_response(request, response)
+
+        patch_vary_headers(response, ("Accept-Encoding",))
+        if len(response.content) < self.min_length:
+            return response
+
+        compressed_content = brotli.compress(response.content, quality=settings.BROTLI_QUALITY)
+        if len(compressed_content) >= len(response.content):
+            return response
+        response.content = compressed_content
+        response.headers["Content-Length"] = str(len(response.content))
+
+        # The body differs from the uncompressed one, so a strong ETag must become weak.
+        etag = response.get("ETag")
+        if etag and etag.startswith('"'):
+            response.headers["ETag"] = "W/" + etag
+        response.headers["Content-Encoding"] = "br"
+        return response
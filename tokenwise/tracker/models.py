@@ -1,15 +1,27 @@
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVector, SearchVectorField
 from django.db import models
 
 class Wallet(models.Model):
     """Represents a Solana wallet being tracked."""
     address = models.CharField(max_length=44, unique=True, primary_key=True)
     balance = models.BigIntegerField(help_text="The token balance in the smallest unit (e.g., lamports)")
+    owner = models.CharField(max_length=44, blank=True, null=True, db_index=True, help_text="The wallet that owns this token account")
     first_seen = models.DateTimeField(auto_now_add=True)
     last_updated = models.DateTimeField(auto_now=True)
 
     def __str__(self):
         return self.address
 
+class TokenAccountOwner(models.Model):
+    """Persistent mapping from an SPL token account to its owner wallet. Token accounts rarely change owner."""
+    token_account = models.CharField(max_length=44, primary_key=True)
+    owner = models.CharField(max_length=44, db_index=True)
+    resolved_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.token_account} -> {self.owner}"
+
 class SolanaMetric(models.Model):
     """A simple key-value store for storing metrics like Solana price or chart data."""
     name = models.CharField(max_length=50, primary_key=True)
@@ -36,9 +48,111 @@ class Transaction(models.Model):
     transaction_type = models.CharField(max_length=10, choices=TRANSACTION_TYPE_CHOICES, default='UNKNOWN')
     amount = models.BigIntegerField(help_text="The amount of the target token transferred", default=0)
     protocol = models.CharField(max_length=50, blank=True, null=True, help_text="Protocol used for the swap (e.g., JUPITER)")
+    ingested_at = models.DateTimeField(
+        auto_now_add=True, db_index=True,
+        help_text="When the row was stored; the analytics export rewrites the days that gained rows since its last run",
+    )
+    search_vector = models.GeneratedField(
+        expression=SearchVector('description', config='english'),
+        output_field=SearchVectorField(),
+        db_persist=True,
+        help_text="Full-text search document for the description, maintained by Postgres",
+    )
 
     class Meta:
         ordering = ['-timestamp']
+        # Every filter on the transaction endpoints is backed by an index. The trigram
+        # index needs the pg_trgm extension (CREATE EXTENSION IF NOT EXISTS pg_trgm).
+        indexes = [
+            models.Index(fields=['-timestamp'], name='transaction_timestamp_idx'),
+            models.Index(fields=['wallet', '-timestamp'], name='transaction_wallet_ts_idx'),
+            models.Index(fields=['protocol', '-timestamp'], name='transaction_protocol_ts_idx'),
+            models.Index(fields=['transaction_type', '-timestamp'], name='transaction_type_ts_idx'),
+            models.Index(fields=['amount'], name='transaction_amount_idx'),
+            GinIndex(fields=['search_vector'], name='transaction_search_idx'),
+            GinIndex(fields=['wallet'], opclasses=['gin_trgm_ops'], name='transaction_wallet_trgm_idx'),
+        ]
 
     def __str__(self):
         return f"{self.wallet.address} - {self.transaction_type} - {self.signature}"
+
+
+class WalletProfile(models.Model):
+    """Running activity summary for a wallet, maintained incrementally as its transactions are ingested."""
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, primary_key=True, related_name='profile')
+    total_bought = models.BigIntegerField(default=0, db_index=True)
+    total_sold = models.BigIntegerField(default=0, db_index=True)
+    net_flow = models.BigIntegerField(default=0, db_index=True, help_text="total_bought - total_sold")
+    tx_count = models.PositiveIntegerField(default=0, db_index=True)
+    first_activity = models.DateTimeField(blank=True, null=True)
+    last_activity = models.DateTimeField(blank=True, null=True, db_index=True)
+    protocol_counts = models.JSONField(default=dict, help_text="Number of transactions per protocol")
+    favourite_protocol = models.CharField(max_length=50, blank=True, null=True)
+
+    class Meta:
+        indexes = [
+            # `?ordering=-last_activity` sorts wallets without activity last, which a backward
+            # scan of the ascending index (DESC NULLS FIRST) cannot provide.
+            models.Index(models.F('last_activity').desc(nulls_last=True), name='profile_last_activity_desc_idx'),
+        ]
+
+    def __str__(self):
+        return f"Profile of {self.wallet_id}"
+
+    def apply_transactions(self, transactions):
+        """Folds newly ingested transactions into the summary without re-reading the wallet's history."""
+        for tx in transactions:
+            amount = int(tx.amount)
+            if tx.transaction_type == 'BUY':
+                self.total_bought += amount
+            elif tx.transaction_type == 'SELL':
+                self.total_sold += amount
+            self.tx_count += 1
+            if self.first_activity is None or tx.timestamp < self.first_activity:
+                self.first_activity = tx.timestamp
+            if self.last_activity is None or tx.timestamp > self.last_activity:
+                self.last_activity = tx.timestamp
+            if tx.protocol:
+                self.protocol_counts[tx.protocol] = self.protocol_counts.get(tx.protocol, 0) + 1
+
+        self.net_flow = self.total_bought - self.total_sold
+        if self.protocol_counts:
+            self.favourite_protocol = max(self.protocol_counts, key=self.protocol_counts.get)
+
+
+class Alert(models.Model):
+    """An unusual wallet move flagged by the alert engine while transactions were being ingested."""
+    RULE_CHOICES = [
+        ('LARGE_TRANSFER', 'Large transfer'),
+        ('NET_OUTFLOW', 'Net outflow'),
+        ('NEW_PROTOCOL', 'New protocol'),
+    ]
+
+    wallet = models.ForeignKey(Wallet, on_delete=models.CASCADE, related_name='alerts')
+    transaction = models.ForeignKey(Transaction, on_delete=models.SET_NULL, blank=True, null=True, related_name='alerts')
+    rule = models.CharField(max_length=20, choices=RULE_CHOICES, db_index=True)
+    message = models.TextField()
+    data = models.JSONField(default=dict, help_text="Rule-specific details, e.g. thresholds and window totals")
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+
+    class Meta:
+        ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['wallet', '-created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.rule} - {self.wallet_id}"
+
+
+class WalletPollState(models.Model):
+    """When a wallet's transactions are next polled, and how far polling has backed off for it."""
+    wallet = models.OneToOneField(Wallet, on_delete=models.CASCADE, primary_key=True, related_name='poll_state')
+    next_poll_at = models.DateTimeField(db_index=True, help_text="The dispatcher polls wallets in order of this time")
+    interval_seconds = models.PositiveIntegerField(help_text="Current polling interval, doubled after every empty poll")
+    empty_polls = models.PositiveIntegerField(default=0, help_text="Consecutive polls that returned nothing new")
+    last_polled_at = models.DateTimeField(blank=True, null=True)
+    last_activity_at = models.DateTimeField(blank=True, null=True, help_text="When new transactions were last seen")
+
+    def __str__(self):
+        return f"{self.wallet_id} next at {self.next_poll_at}"
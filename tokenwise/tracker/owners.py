@@ -0,0 +1,104 @@
+import base64
+from cachetools import LRUCache
+from django.conf import settings
+from .holders import SPL_TOKEN_PROGRAM_ID, OWNER_OFFSET
+from .models import TokenAccountOwner
+from .clients import get_solana_rpc
+from .rpc import b58encode
+
+TOKEN_2022_PROGRAM_ID = 'TokenzQdBNbLqP5VEhdkAS6EN5CcE6Yf8NQkXW2Wjtfq'
+TOKEN_PROGRAM_IDS = {SPL_TOKEN_PROGRAM_ID, TOKEN_2022_PROGRAM_ID}
+
+# getMultipleAccounts accepts at most 100 addresses per call.
+MAX_ACCOUNTS_PER_CALL = 100
+
+# Sentinel stored in the in-memory cache for addresses that are not token accounts,
+# so they are not looked up again for the lifetime of the process.
+NOT_A_TOKEN_ACCOUNT = ''
+
+# Shared by every resolver in the process.
+_owner_cache = LRUCache(maxsize=settings.OWNER_CACHE_SIZE)
+
+
+class OwnerResolver:
+    """
+    Resolves SPL token accounts to the wallets that own them.
+    Lookups go through a process-wide LRU, then the TokenAccountOwner table, and only
+    the remaining misses hit the RPC, batched 100 at a time with getMultipleAccounts.
+    """
+
+    def __init__(self, rpc=None, cache=None):
+        self._rpc = rpc
+        self.cache = _owner_cache if cache is None else cache
+
+    @property
+    def rpc(self):
+        # Looked up on each use, so a resolver created before a fork does not keep the parent's sockets.
+        return self._rpc or get_solana_rpc()
+
+    def remember(self, mapping):
+        """Stores already known token account -> owner pairs (e.g. from holder discovery)."""
+        mapping = {account: owner for account, owner in mapping.items() if account and owner}
+        changed = {account: owner for account, owner in mapping.items() if self.cache.get(account) != owner}
+        if not changed:
+            return
+        TokenAccountOwner.objects.bulk_create(
+            [TokenAccountOwner(token_account=account, owner=owner) for account, owner in changed.items()],
+            update_conflicts=True,
+            unique_fields=['token_account'],
+            update_fields=['owner', 'resolved_at'],
+        )
+        self.cache.update(changed)
+
+    def resolve(self, token_accounts):
+        """
+        Returns a dict mapping each given token account to its owner.
+        Addresses that are not token accounts (e.g. plain wallets) are left out.
+        """
+        owners = {}
+        pending = []
+        for account in set(filter(None, token_accounts)):
+            cached = self.cache.get(account)
+            if cached is None:
+                pending.append(account)
+            elif cached != NOT_A_TOKEN_ACCOUNT:
+                owners[account] = cached
+
+        if pending:
+            stored = dict(
+                TokenAccountOwner.objects.filter(token_account__in=pending).values_list('token_account', 'owner')
+            )
+            self.cache.update(stored)
+            owners.update(stored)
+            pending = [account for account in pending if account not in stored]
+
+        if pending:
+            fetched = self._fetch_owners(pending)
+            self.remember(fetched)
+            owners.update(fetched)
+            for account in pending:
+                if account not in fetched:
+                    self.cache[account] = NOT_A_TOKEN_ACCOUNT
+
+        return owners
+
+    def resolve_one(self, token_account):
+        """Returns the owner of a single token account, or None if it is not a token account."""
+        return self.resolve([token_account]).get(token_account)
+
+    def _fetch_owners(self, token_accounts):
+        """Reads the owner field of each token account from the chain, 100 accounts per RPC call."""
+        owners = {}
+        for start in range(0, len(token_accounts), MAX_ACCOUNTS_PER_CALL):
+            batch = token_accounts[start:start + MAX_ACCOUNTS_PER_CALL]
+            result = self.rpc.call('getMultipleAccounts', [
+                batch,
+                {"encoding": "base64", "dataSlice": {"offset": OWNER_OFFSET, "length": 32}},
+            ])
+            for account, info in zip(batch, (result or {}).get('value') or []):
+                if not info or info.get('owner') not in TOKEN_PROGRAM_IDS:
+                    continue
+                raw = base64.b64decode(info['data'][0])
+                if len(raw) == 32:
+                    owners[account] = b58encode(raw)
+        return owners
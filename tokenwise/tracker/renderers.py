@@ -0,0 +1,86 @@
+import orjson
+from django.http import HttpResponse
+from rest_framework.renderers import BaseRenderer
+from rest_framework.utils.encoders import JSONEncoder
+
+# Renderers for the API, negotiated from the Accept header (or `?format=`):
+#   application/json                          orjson, same document as DRF's JSONRenderer
+#   application/vnd.tokenwise.columnar+json   list pages as one array per field
+#   application/msgpack                       MessagePack, same document as JSON
+
+_fallback_encoder = JSONEncoder()
+
+
+def _default(obj):
+    # Decimals, lazy strings, querysets and the like are encoded the way DRF's encoder does.
+    return _fallback_encoder.default(obj)
+
+
+def to_columnar(data):
+    """
+    Rewrites the `results` of a paginated page from a list of rows into one array per field:
+    {"count": ..., "next": ..., "previous": ..., "columns": [...], "results": {"field": [...]}}.
+    Field names are sent once instead of once per row. Other documents are returned unchanged.
+    """
+    if not isinstance(data, dict) or not isinstance(data.get('results'), list):
+        return data
+    rows = data['results']
+    columns = list(rows[0]) if rows else []
+    columnar = {key: value for key, value in data.items() if key != 'results'}
+    columnar['columns'] = columns
+    columnar['results'] = {column: [row[column] for row in rows] for column in columns}
+    return columnar
+
+
+class ORJSONRenderer(BaseRenderer):
+    """Drop-in replacement for DRF's JSONRenderer built on orjson."""
+    media_type = 'application/json'
+    format = 'json'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+        return orjson.dumps(data, default=_default)
+
+
+class ColumnarJSONRenderer(ORJSONRenderer):
+    """JSON with paginated results laid out per field, for large pages."""
+    media_type = 'application/vnd.tokenwise.columnar+json'
+    format = 'columnar'
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        return super().render(to_columnar(data), accepted_media_type, renderer_context)
+
+
+class MessagePackRenderer(BaseRenderer):
+    """MessagePack encoding of the same document the JSON renderer returns."""
+    media_type = 'application/msgpack'
+    format = 'msgpack'
+    charset = None
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        import msgpack
+        if data is None:
+            return b''
+        return msgpack.packb(data, default=_default, use_bin_type=True)
+
+
+API_RENDERERS = (ORJSONRenderer, ColumnarJSONRenderer, MessagePackRenderer)
+
+
+def render_response(request, data, status=200):
+    """
+    Renders `data` for a plain Django view with the renderer the client asked for,
+    so the async read views speak the same formats as the DRF views.
+    """
+    requested = request.GET.get('format')
+    accept = request.headers.get('Accept', '')
+    renderer = ORJSONRenderer
+    for candidate in (ColumnarJSONRenderer, MessagePackRenderer):
+        if requested == candidate.format or (not requested and candidate.media_type in accept):
+            renderer = candidate
+            break
+    response = HttpResponse(renderer().render(data), status=status, content_type=renderer.media_type)
+    response.headers['Vary'] = 'Accept'
+    return response
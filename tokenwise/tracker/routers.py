@@ -0,0 +1,94 @@
+import random
+import time
+from contextvars import ContextVar
+from django.conf import settings
+from .clients import get_redis_client
+
+PRIMARY_DB = 'default'
+
+# Database alias that reads in the current context should go to. Everything defaults
+# to the primary; only read-only API requests are switched to a replica (see
+# ReplicaRoutingMiddleware), so ingestion, refresh, management commands and Celery
+# tasks always read what they write.
+_read_alias = ContextVar('tokenwise_read_alias', default=PRIMARY_DB)
+
+
+def choose_replica():
+    """Picks one of the configured read replicas, or the primary if there are none."""
+    if not settings.DATABASE_REPLICAS:
+        return PRIMARY_DB
+    return random.choice(settings.DATABASE_REPLICAS)
+
+
+def route_reads_to(alias):
+    """Sends reads in the current context to `alias`. Returns a token for `reset_read_route`."""
+    return _read_alias.set(alias)
+
+
+def reset_read_route(token):
+    _read_alias.reset(token)
+
+
+# After a data refresh finishes, API reads go to the primary for REPLICA_STICKY_SECONDS so no
+# client sees pre-refresh data from a lagging replica. The deadline lives in Redis because the
+# refresh runs in a Celery worker while reads are served by the web processes.
+PRIMARY_PIN_KEY = 'tokenwise:routing:read-primary-until'
+# Web processes re-read the deadline at most this often.
+PRIMARY_PIN_CHECK_SECONDS = 1.0
+# The pin is checked while serving requests, so an unreachable Redis must fail fast.
+PRIMARY_PIN_SOCKET_TIMEOUT = 0.5
+_pin = {'until': 0.0, 'checked': 0.0}
+
+
+def _pin_client():
+    return get_redis_client(
+        settings.REPLICA_PIN_REDIS_URL,
+        socket_timeout=PRIMARY_PIN_SOCKET_TIMEOUT,
+        socket_connect_timeout=PRIMARY_PIN_SOCKET_TIMEOUT,
+    )
+
+
+def pin_reads_to_primary(seconds=None):
+    """Sends API reads of every web process to the primary for the next `seconds`."""
+    seconds = settings.REPLICA_STICKY_SECONDS if seconds is None else seconds
+    if not settings.DATABASE_REPLICAS or seconds <= 0:
+        return
+    _pin_client().set(PRIMARY_PIN_KEY, time.time() + seconds, ex=seconds)
+
+
+def pin_check_due():
+    """True when the next reads_pinned_to_primary() call will query Redis instead of its cached answer."""
+    return time.time() - _pin['checked'] >= PRIMARY_PIN_CHECK_SECONDS
+
+
+def reads_pinned_to_primary():
+    """True while a recent refresh pins API reads to the primary."""
+    import redis
+    now = time.time()
+    if now - _pin['checked'] >= PRIMARY_PIN_CHECK_SECONDS:
+        try:
+            value = _pin_client().get(PRIMARY_PIN_KEY)
+            _pin['until'] = float(value) if value else 0.0
+        except redis.RedisError as e:
+            # Without Redis no refresh can have run (it is the Celery broker), so replicas are fine.
+            print(f"Could not read the primary pin: {e}")
+            _pin['until'] = 0.0
+        _pin['checked'] = now
+    return now < _pin['until']
+
+
+class ReplicaRouter:
+    """Routes writes to the primary and reads to the replica chosen for the current context."""
+
+    def db_for_read(self, model, **hints):
+        return _read_alias.get()
+
+    def db_for_write(self, model, **hints):
+        return PRIMARY_DB
+
+    def allow_relation(self, obj1, obj2, **hints):
+        # Replicas hold the same data as the primary.
+        return True
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        return db == PRIMARY_DB
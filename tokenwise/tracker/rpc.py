@@ -0,0 +1,176 @@
+import codecs
+import itertools
+import json
+import requests
+from django.conf import settings
+
+B58_ALPHABET = '123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+_decoder = json.JSONDecoder()
+
+
+class RpcError(Exception):
+    """Raised when a JSON-RPC call returns an error or a malformed response."""
+
+
+def b58encode(raw: bytes) -> str:
+    """Encodes raw bytes (e.g. a 32-byte public key) as a base58 string."""
+    number = int.from_bytes(raw, 'big')
+    encoded = ''
+    while number:
+        number, remainder = divmod(number, 58)
+        encoded = B58_ALPHABET[remainder] + encoded
+    # Every leading zero byte is represented by a leading '1'.
+    padding = len(raw) - len(raw.lstrip(b'\0'))
+    return B58_ALPHABET[0] * padding + encoded
+
+
+def iter_json_array(chunks, key='"result"'):
+    """
+    Incrementally decodes the array stored under `key` in a streamed JSON document.
+    Only the current element and the unread part of the last chunk are held in memory,
+    so arbitrarily large responses are parsed in constant space.
+    """
+    chunks = iter(chunks)
+    buffer = ''
+
+    # Skip ahead to the opening bracket of the array.
+    while True:
+        start = buffer.find(key)
+        if start != -1:
+            bracket = buffer.find('[', start + len(key))
+            if bracket != -1:
+                buffer = buffer[bracket + 1:]
+                break
+        chunk = next(chunks, None)
+        if chunk is None:
+            # No array in the response: either an error object or a null result.
+            try:
+                body = json.loads(buffer)
+            except json.JSONDecodeError:
+                raise RpcError(f"Unexpected JSON-RPC response: {buffer[:500]}")
+            if body.get('error'):
+                raise RpcError(body['error'])
+            return
+        buffer += chunk
+
+    while True:
+        buffer = buffer.lstrip(' \t\r\n,')
+        if buffer.startswith(']'):
+            return
+        try:
+            item, end = _decoder.raw_decode(buffer)
+        except json.JSONDecodeError:
+            chunk = next(chunks, None)
+            if chunk is None:
+                raise RpcError("Truncated JSON-RPC response.")
+            buffer += chunk
+            continue
+        yield item
+        buffer = buffer[end:]
+
+
+class SolanaRpc:
+    """
+    A thin JSON-RPC transport for the calls that solana-py does not expose efficiently
+    (raw getProgramAccounts streaming, Helius DAS methods, batched account lookups).
+    """
+
+    def __init__(self, url=None, session=None, timeout=60):
+        self.url = url or settings.SOLANA_RPC_URL
+        self.session = session or requests.Session()
+        self.timeout = timeout
+        self._ids = itertools.count(1)
+
+    def _payload(self, method, params):
+        return {"jsonrpc": "2.0", "id": next(self._ids), "method": method, "params": params}
+
+    def call(self, method, params):
+        """Performs a single JSON-RPC call and returns its `result`."""
+        response = self.session.post(self.url, json=self._payload(method, params), timeout=self.timeout)
+        response.raise_for_status()
+        body = response.json()
+        if body.get('error'):
+            raise RpcError(body['error'])
+        return body.get('result')
+
+    def stream_result_items(self, method, params, chunk_size=64 * 1024):
+        """Performs a JSON-RPC call whose result is an array and yields its elements as they arrive."""
+        with self.session.post(
+            self.url, json=self._payload(method, params), timeout=self.timeout, stream=True
+        ) as response:
+            response.raise_for_status()
+            decoder = codecs.getincrementaldecoder('utf-8')()
+            chunks = (decoder.decode(chunk) for chunk in response.iter_content(chunk_size))
+            yield from iter_json_array(chunks)
+
+
+class _RecordedResponse:
+    def __init__(self, body, chunk_size):
+        self.content = body.encode()
+        self.status_code = 200
+        self.chunk_size = chunk_size
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def json(self):
+        return json.loads(self.content)
+
+    def iter_content(self, chunk_size=None):
+        # The recording's own chunk size is used, so small values split tokens and multi-byte characters.
+        for start in range(0, len(self.content), self.chunk_size):
+            yield self.content[start:start + self.chunk_size]
+
+
+# `post` takes a `json` keyword like requests does, which shadows the module inside it.
+_json_dumps = json.dumps
+
+
+class _RecordedSession:
+    def __init__(self, recordings, chunk_size):
+        self.recordings = {method: list(responses) for method, responses in recordings.items()}
+        self.chunk_size = chunk_size
+        self.calls = []
+
+    def post(self, url, json=None, timeout=None, stream=False):
+        method = json['method']
+        self.calls.append((method, json['params']))
+        responses = self.recordings.get(method)
+        if not responses:
+            raise RpcError(f"No recorded response left for {method}.")
+        body = responses.pop(0)
+        return _RecordedResponse(body if isinstance(body, str) else _json_dumps(body), self.chunk_size)
+
+
+class RecordedSolanaRpc(SolanaRpc):
+    """
+    A SolanaRpc that replays recorded JSON-RPC responses instead of calling a node, for tests
+    and offline runs. `recordings` maps a method name to the response bodies of its successive
+    calls (e.g. one body per getTokenAccounts page), either as JSON text or decoded objects:
+
+        {"getProgramAccounts": [{"jsonrpc": "2.0", "id": 1, "result": [...]}],
+         "getTokenAccounts": [{"result": {"token_accounts": [...]}}, ...]}
+
+    Responses are streamed back in `chunk_size` byte pieces. `calls` lists the (method, params)
+    of every request made.
+    """
+
+    def __init__(self, recordings, chunk_size=64 * 1024):
+        super().__init__(url='recorded://', session=_RecordedSession(recordings, chunk_size))
+
+    @classmethod
+    def from_file(cls, path, **kwargs):
+        """Loads recordings from a JSON file in the format above."""
+        with open(path) as f:
+            return cls(json.load(f), **kwargs)
+
+    @property
+    def calls(self):
+        return self.session.calls
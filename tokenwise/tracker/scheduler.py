@@ -0,0 +1,138 @@
+import random
+from datetime import timedelta
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F
+from django.db.models.functions import Least
+from django.utils import timezone
+from .models import Wallet, WalletPollState
+
+# Every tracked wallet has a WalletPollState row, and the index on next_poll_at is the
+# priority queue: the dispatcher takes the most overdue wallets first. A poll that finds
+# nothing new doubles the wallet's interval (up to POLL_MAX_INTERVAL_SECONDS); a poll
+# with new transactions or a large balance change drops it back to POLL_MIN_INTERVAL_SECONDS.
+# Activity delivered by the webhook is already stored, so it postpones the wallet's next
+# reconciliation poll instead.
+
+
+def _jittered(seconds):
+    # Spreads wallets that backed off together, so they do not fall due in the same tick.
+    return timedelta(seconds=seconds * random.uniform(0.9, 1.1))
+
+
+def ensure_poll_states(wallets=None):
+    """Schedules an immediate first poll for tracked wallets that have no poll state yet."""
+    if wallets is None:
+        wallets = Wallet.objects.filter(poll_state__isnull=True)
+    now = timezone.now()
+    WalletPollState.objects.bulk_create(
+        [
+            WalletPollState(wallet=wallet, next_poll_at=now, interval_seconds=settings.POLL_MIN_INTERVAL_SECONDS)
+            for wallet in wallets
+        ],
+        ignore_conflicts=True,
+    )
+
+
+def claim_due_wallets(limit):
+    """
+    Returns the addresses of up to `limit` wallets whose next poll is due, most overdue first.
+    Claimed rows are leased for one interval, and rows claimed by a concurrent dispatcher are
+    skipped, so a wallet is never handed out twice.
+    """
+    now = timezone.now()
+    with transaction.atomic():
+        states = list(
+            WalletPollState.objects.select_for_update(skip_locked=True)
+            .filter(next_poll_at__lte=now)
+            .order_by('next_poll_at')[:limit]
+        )
+        for state in states:
+            # Pushed forward again when the poll completes; if it never does, the wallet is retried.
+            state.next_poll_at = now + timedelta(seconds=state.interval_seconds)
+        WalletPollState.objects.bulk_update(states, ['next_poll_at'])
+    return [state.wallet_id for state in states]
+
+
+def record_poll(wallet_address, new_transactions):
+    """
+    Reschedules a wallet after a poll. `new_transactions` is the number of transactions it
+    stored, or None if the poll failed, in which case the interval is kept as it is.
+    """
+    now = timezone.now()
+    state, _ = WalletPollState.objects.get_or_create(
+        wallet_id=wallet_address,
+        defaults={'next_poll_at': now, 'interval_seconds': settings.POLL_MIN_INTERVAL_SECONDS},
+    )
+    if new_transactions:
+        state.interval_seconds = settings.POLL_MIN_INTERVAL_SECONDS
+        state.empty_polls = 0
+        state.last_activity_at = now
+    elif new_transactions is not None:
+        state.interval_seconds = min(
+            int(state.interval_seconds * settings.POLL_BACKOFF_FACTOR), settings.POLL_MAX_INTERVAL_SECONDS
+        )
+        state.empty_polls += 1
+    state.last_polled_at = now
+    state.next_poll_at = now + _jittered(state.interval_seconds)
+    state.save()
+
+
+def expedite_wallets(wallet_addresses):
+    """
+    Resets the polling interval of wallets that just showed activity polling has not seen
+    (e.g. a large balance change), so they are polled again within POLL_MIN_INTERVAL_SECONDS.
+    """
+    if not wallet_addresses:
+        return
+    interval = settings.POLL_MIN_INTERVAL_SECONDS
+    WalletPollState.objects.filter(wallet_id__in=wallet_addresses).update(
+        interval_seconds=interval,
+        empty_polls=0,
+        last_activity_at=timezone.now(),
+        next_poll_at=Least(F('next_poll_at'), timezone.now() + timedelta(seconds=interval)),
+    )
+
+
+def make_all_wallets_due():
+    """
+    Makes every tracked wallet due now, e.g. after a manual refresh. The dispatcher still polls
+    at most POLL_BATCH_SIZE wallets per run, and intervals are kept, since nothing new was seen.
+    """
+    ensure_poll_states()
+    now = timezone.now()
+    return WalletPollState.objects.filter(next_poll_at__gt=now).update(next_poll_at=now)
+
+
+def postpone_wallets(wallet_addresses):
+    """
+    Records webhook activity for wallets: their transactions just arrived without a poll, so
+    the next reconciliation poll is moved to a full interval from now. Intervals are kept.
+    """
+    if not wallet_addresses:
+        return
+    now = timezone.now()
+    with transaction.atomic():
+        states = list(WalletPollState.objects.select_for_update().filter(wallet_id__in=wallet_addresses))
+        for state in states:
+            state.last_activity_at = now
+            state.next_poll_at = max(state.next_poll_at, now + _jittered(state.interval_seconds))
+        WalletPollState.objects.bulk_update(states, ['last_activity_at', 'next_poll_at'])
+
+
+def changed_balances(previous, current):
+    """
+    Returns the wallets whose balance moved by at least POLL_BALANCE_CHANGE_SHARE between two
+    {address: balance} snapshots. Wallets missing from `previous` are new and already due.
+    """
+    share = settings.POLL_BALANCE_CHANGE_SHARE
+    return [
+        address for address, balance in current.items()
+        if address in previous and abs(balance - previous[address]) > share * max(previous[address], 1)
+    ]
+
+
+def estimated_polls_per_hour():
+    """Provider calls per hour at the current intervals, next to a flat poll every 5 minutes."""
+    intervals = list(WalletPollState.objects.values_list('interval_seconds', flat=True))
+    return sum(3600 / interval for interval in intervals), len(intervals) * 12
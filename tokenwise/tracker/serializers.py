@@ -1,5 +1,5 @@
 from rest_framework import serializers
-from .models import Wallet, Transaction
+from .models import Wallet, WalletProfile, Transaction, Alert
 
 # The number of decimal places for the token
 TOKEN_DECIMALS = 1_000_000
@@ -8,10 +8,26 @@ class WalletSerializer(serializers.ModelSerializer):
     """Serializer for the Wallet model, including calculated token quantity and USD balance."""
     token_quantity = serializers.SerializerMethodField()
     balance_usd = serializers.SerializerMethodField()
+    total_bought = serializers.IntegerField(source='profile.total_bought', read_only=True)
+    total_sold = serializers.IntegerField(source='profile.total_sold', read_only=True)
+    net_flow = serializers.IntegerField(source='profile.net_flow', read_only=True)
+    tx_count = serializers.IntegerField(source='profile.tx_count', read_only=True)
+    last_activity = serializers.DateTimeField(source='profile.last_activity', read_only=True)
 
     class Meta:
         model = Wallet
-        fields = ['address', 'token_quantity', 'balance_usd', 'last_updated']
+        fields = [
+            'address',
+            'owner',
+            'token_quantity',
+            'balance_usd',
+            'last_updated',
+            'total_bought',
+            'total_sold',
+            'net_flow',
+            'tx_count',
+            'last_activity',
+        ]
 
     def get_token_quantity(self, obj):
         """Convert the raw balance to a user-friendly token quantity."""
@@ -24,9 +40,28 @@ class WalletSerializer(serializers.ModelSerializer):
         price = self.context.get('solana_price', 0)
         return token_quantity * price
 
+class WalletProfileSerializer(serializers.ModelSerializer):
+    """Serializer for a wallet's incrementally maintained activity summary."""
+    address = serializers.CharField(source='wallet_id', read_only=True)
+
+    class Meta:
+        model = WalletProfile
+        fields = [
+            'address',
+            'total_bought',
+            'total_sold',
+            'net_flow',
+            'tx_count',
+            'first_activity',
+            'last_activity',
+            'favourite_protocol',
+            'protocol_counts',
+        ]
+
 class TransactionSerializer(serializers.ModelSerializer):
     """Standardized serializer for the Transaction model."""
-    wallet_address = serializers.CharField(source='wallet.address', read_only=True)
+    # The wallet's address is its primary key, so it is read off the foreign key column without a join.
+    wallet_address = serializers.CharField(source='wallet_id', read_only=True)
 
     class Meta:
         model = Transaction
@@ -43,7 +78,7 @@ class TransactionSerializer(serializers.ModelSerializer):
 
 class HistoricalTransactionSerializer(serializers.ModelSerializer):
     """Serializer for the historical transaction data, ensuring consistent field names."""
-    wallet_address = serializers.CharField(source='wallet.address', read_only=True)
+    wallet_address = serializers.CharField(source='wallet_id', read_only=True)
 
     class Meta:
         model = Transaction
@@ -55,3 +90,21 @@ class HistoricalTransactionSerializer(serializers.ModelSerializer):
             'amount',
             'protocol',
         ]
+
+
+class AlertSerializer(serializers.ModelSerializer):
+    """Serializer for alerts raised by the alert engine."""
+    wallet_address = serializers.CharField(source='wallet_id', read_only=True)
+    signature = serializers.CharField(source='transaction_id', read_only=True)
+
+    class Meta:
+        model = Alert
+        fields = [
+            'id',
+            'created_at',
+            'rule',
+            'wallet_address',
+            'signature',
+            'message',
+            'data',
+        ]
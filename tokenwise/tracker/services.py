@@ -1,45 +1,85 @@
 import traceback
 import requests
-import subprocess
 import json
-from datetime import datetime
+from datetime import datetime, timezone
 from django.conf import settings
-from solana.rpc.api import Client
-from solders.pubkey import Pubkey
-from pycoingecko import CoinGeckoAPI
+from django.db.models import Q
+from .clients import get_coingecko_client, get_http_session, get_solana_rpc
 from .models import Wallet, Transaction, SolanaMetric
+from .holders import get_holder_source, rank_top_holders
+from .owners import OwnerResolver
+from .ingestion import ensure_wallet_profiles, persist_wallet_transactions
+from .routers import pin_reads_to_primary
+from .scheduler import changed_balances, ensure_poll_states, expedite_wallets, make_all_wallets_due, record_poll
+
+
+def classify_transfer(transfers, token_account, owner, transfer_owners=None):
+    """
+    Finds the first transfer involving a wallet and classifies it as a BUY or SELL.
+    A transfer involves the wallet if it moves tokens from/to its token account or
+    from/to any token account owned by `owner`. Owners missing from the transfer
+    payload are looked up in `transfer_owners`.
+    Returns a (transaction_type, transfer) tuple, or ('UNKNOWN', None).
+    """
+    transfer_owners = transfer_owners or {}
+    for transfer in transfers:
+        from_owner = transfer.get('fromUserAccount') or transfer_owners.get(transfer.get('fromTokenAccount'))
+        to_owner = transfer.get('toUserAccount') or transfer_owners.get(transfer.get('toTokenAccount'))
+        if transfer.get('fromTokenAccount') == token_account or from_owner == owner:
+            return 'SELL', transfer
+        if transfer.get('toTokenAccount') == token_account or to_owner == owner:
+            return 'BUY', transfer
+    return 'UNKNOWN', None
+
 
 class SolanaService:
     """A service for interacting with the Solana blockchain."""
 
-    def __init__(self):
-        self.client = Client(settings.SOLANA_RPC_URL, timeout=30)
+    def __init__(self, rpc=None):
+        # `rpc` replaces the shared JSON-RPC transport, e.g. with a RecordedSolanaRpc in tests.
+        self._rpc = rpc
         self.token_mint_address = settings.TARGET_TOKEN_MINT_ADDRESS
         try:
             self.api_key = settings.SOLANA_RPC_URL.split('api-key=')[-1]
         except IndexError:
             raise ValueError("SOLANA_RPC_URL in .env file is missing an API key.")
         self.api_base_url = "https://api.helius.xyz/v0/addresses"
-        self.coingecko_client = CoinGeckoAPI()
+        self.owner_resolver = OwnerResolver(rpc=rpc)
+
+    # Provider clients are looked up on each use rather than kept on the instance, so the
+    # process-wide service stays valid in a forked child (see clients.py).
+    @property
+    def http(self):
+        return get_http_session()
+
+    @property
+    def rpc(self):
+        return self._rpc or get_solana_rpc()
+
+    @property
+    def coingecko_client(self):
+        return get_coingecko_client()
 
-    def get_top_token_holders(self, limit=60):
-        """Fetches the top token holders for the target token."""
+    def get_top_token_holders(self, limit=None):
+        """
+        Fetches the top token holders for the target token.
+        Every token account of the mint is enumerated, rather than relying on
+        getTokenLargestAccounts which is capped at 20, and ranked by balance.
+        """
+        limit = limit or settings.TOKEN_HOLDER_LIMIT
         try:
-            mint_pubkey = Pubkey.from_string(self.token_mint_address)
-            response = self.client.get_token_largest_accounts(mint_pubkey)
-            
-            if response and response.value:
-                return response.value[:limit]
-            else:
-                print(f"Received unexpected response from Solana RPC: {response}")
-                return []
+            source = get_holder_source(rpc=self.rpc, mint=self.token_mint_address)
+            return rank_top_holders(source, limit)
         except Exception as e:
             print(f"An error occurred while fetching top token holders: {type(e).__name__} - {e}")
             traceback.print_exc()
             return []
 
     def get_wallet_transactions(self, wallet_address: str, limit: int = 100):
-        """Fetches and stores recent transactions for a given wallet address from Helius."""
+        """
+        Fetches and stores recent transactions for a given wallet address from Helius.
+        Returns the number of new transactions, or None if the fetch failed.
+        """
         print(f"Fetching transactions for wallet: {wallet_address}")
         api_url = f"{self.api_base_url}/{wallet_address}/transactions"
         params = {
@@ -48,107 +88,119 @@ class SolanaService:
         }
         
         try:
-            # Construct the full URL with parameters
-            full_url = f"{api_url}?api-key={self.api_key}&limit={limit}"
-            
-            print(f"--> Making request with curl to: {api_url}")
-            
-            # Use curl via subprocess, which is more reliable for large responses
-            process = subprocess.run(
-                ['curl', '-s', '-L', full_url],  # -s for silent, -L to follow redirects
-                capture_output=True, 
-                text=True, 
-                timeout=60
-            )
-            
-            if process.returncode != 0:
-                print(f"Error calling curl: {process.stderr}")
-                return
-
-            print("--> Received response from curl")
-            
-            if not process.stdout:
-                print("--> Curl returned empty output.")
+            print(f"--> Making request to: {api_url}")
+
+            # The pooled session reuses the TLS connection to Helius across wallets and task runs.
+            response = self.http.get(api_url, params=params, timeout=60)
+            if response.status_code != 200:
+                print(f"Error calling Helius API ({response.status_code}): {response.text[:500]}")
+                return None
+
+            print("--> Received response from Helius")
+
+            if not response.content:
+                print("--> Helius returned an empty response.")
                 transactions_data = []
             else:
                 try:
-                    transactions_data = json.loads(process.stdout)
-                except json.JSONDecodeError:
+                    transactions_data = response.json()
+                except ValueError:
                     print("Error: Failed to decode JSON from Helius API response.")
-                    print(f"Raw response snippet: {process.stdout[:500]}")
-                    return
+                    print(f"Raw response snippet: {response.text[:500]}")
+                    return None
 
             if not transactions_data:
                 print(f"No transactions found for wallet {wallet_address}.")
-                return
+                return 0
 
             wallet, _ = Wallet.objects.get_or_create(address=wallet_address)
-            new_tx_count = 0
-
-            for tx_data in transactions_data:
-                signature = tx_data.get("signature")
-                if not signature or Transaction.objects.filter(signature=signature).exists():
-                    continue
-
-                token_transfers = [
-                    t for t in tx_data.get("tokenTransfers", [])
-                    if t.get("mint") == self.token_mint_address
-                ]
-
-                if not token_transfers:
-                    continue
-
-                transfer = token_transfers[0]
-                tx_type = 'UNKNOWN'
-                
-                # Correctly identify buy/sell based on the token account address
-                if transfer.get('fromTokenAccount') == wallet_address:
-                    tx_type = 'SELL'
-                elif transfer.get('toTokenAccount') == wallet_address:
-                    tx_type = 'BUY'
-
-                if tx_type == 'UNKNOWN':
-                    continue
-
-                # The 'tokenAmount' field holds the human-readable, decimal-adjusted amount.
-                # Explicitly cast to float to handle potential string values from the API.
-                try:
-                    amount = float(transfer.get("tokenAmount", 0))
-                except (ValueError, TypeError):
-                    amount = 0.0
-
-                # If amount is zero, log the entire transaction for debugging and skip.
-                if amount == 0.0:
-                    print(f"[WARN] Skipping transaction {signature} due to zero amount. Full data:")
-                    print(json.dumps(tx_data, indent=2))
-                    continue
-                
-                # Robust protocol extraction
-                protocol = tx_data.get("source", "UNKNOWN") # Default to top-level source
-                events = tx_data.get("events", {})
-                if events and "swap" in events:
-                    # Use the more specific protocol from the swap event if available
-                    program_info = events["swap"].get("programInfo", {})
-                    protocol = program_info.get("source", protocol)
-
-                Transaction.objects.create(
-                    signature=signature,
-                    wallet=wallet,
-                    timestamp=datetime.fromtimestamp(tx_data["timestamp"]),
-                    description=tx_data.get("description", ""),
-                    transaction_type=tx_type,
-                    amount=amount,
-                    protocol=protocol,
-                )
-                new_tx_count += 1
-            
-            print(f"Successfully saved {new_tx_count} new transactions for wallet {wallet_address}.")
+            new_transactions = self.store_wallet_transactions(wallet, transactions_data)
+            print(f"Successfully saved {len(new_transactions)} new transactions for wallet {wallet_address}.")
+            return len(new_transactions)
 
         except requests.exceptions.RequestException as e:
             print(f"HTTP Error fetching transactions for {wallet_address}: {e}")
         except Exception as e:
             print(f"An error occurred while processing transactions for {wallet_address}: {type(e).__name__} - {e}")
             traceback.print_exc()
+        return None
+
+    def store_wallet_transactions(self, wallet, transactions_data):
+        """
+        Classifies Helius enhanced transactions for a wallet and stores the ones that move the
+        target token. Used for both polled pages and webhook deliveries; signatures that are
+        already stored are skipped. Returns the newly inserted transactions.
+        """
+        wallet_address = wallet.address
+
+        # Holders are discovered as token accounts, so transfers are also matched on the owning wallet.
+        owner = wallet.owner or self.owner_resolver.resolve_one(wallet_address)
+        if owner and owner != wallet.owner:
+            wallet.owner = owner
+            wallet.save(update_fields=['owner'])
+        owner = owner or wallet_address
+
+        # Owners Helius did not report on a transfer are resolved in one batch for the whole page.
+        unresolved = [
+            t.get(f'{side}TokenAccount')
+            for tx_data in transactions_data
+            for t in tx_data.get("tokenTransfers") or []
+            for side in ('from', 'to')
+            if t.get("mint") == self.token_mint_address and not t.get(f'{side}UserAccount')
+        ]
+        transfer_owners = self.owner_resolver.resolve(unresolved) if unresolved else {}
+
+        parsed_transactions = []
+
+        for tx_data in transactions_data:
+            signature = tx_data.get("signature")
+            if not signature:
+                continue
+
+            token_transfers = [
+                t for t in tx_data.get("tokenTransfers") or []
+                if t.get("mint") == self.token_mint_address
+            ]
+
+            tx_type, transfer = classify_transfer(token_transfers, wallet_address, owner, transfer_owners)
+            if transfer is None:
+                continue
+
+            # The 'tokenAmount' field holds the human-readable, decimal-adjusted amount.
+            # Explicitly cast to float to handle potential string values from the API.
+            try:
+                amount = float(transfer.get("tokenAmount", 0))
+            except (ValueError, TypeError):
+                amount = 0.0
+
+            # If amount is zero, log the entire transaction for debugging and skip.
+            if amount == 0.0:
+                print(f"[WARN] Skipping transaction {signature} due to zero amount. Full data:")
+                print(json.dumps(tx_data, indent=2))
+                continue
+
+            # Robust protocol extraction
+            protocol = tx_data.get("source", "UNKNOWN") # Default to top-level source
+            events = tx_data.get("events", {})
+            if events and "swap" in events:
+                # Use the more specific protocol from the swap event if available
+                program_info = events["swap"].get("programInfo", {})
+                protocol = program_info.get("source", protocol)
+
+            parsed_transactions.append(Transaction(
+                signature=signature,
+                wallet=wallet,
+                timestamp=datetime.fromtimestamp(tx_data["timestamp"], tz=timezone.utc),
+                description=tx_data.get("description", ""),
+                transaction_type=tx_type,
+                # Converted the way the BigIntegerField stores it, so the profile deltas,
+                # alerts and snapshots all see the stored value.
+                amount=int(amount),
+                protocol=protocol,
+            ))
+
+        # New rows and the wallet's profile deltas are written in a single DB transaction.
+        return persist_wallet_transactions(wallet, parsed_transactions)
 
     def get_solana_market_data(self):
         """Fetches Solana market data from CoinGecko and stores it in the database."""
@@ -189,3 +241,117 @@ class SolanaService:
         except Exception as e:
             print(f"An error occurred while fetching CoinGecko data: {e}")
             traceback.print_exc()
+
+
+_service = None
+
+
+def get_solana_service():
+    """Returns the process-wide SolanaService, so its clients and caches are reused between task runs."""
+    global _service
+    if _service is None:
+        _service = SolanaService()
+    return _service
+
+
+def update_top_wallets(service, limit=None):
+    """
+    Discovers the top token holders and upserts them as tracked wallets.
+    Returns a (created, updated) tuple, or None if no holders could be retrieved.
+    """
+    top_holders = service.get_top_token_holders(limit=limit)
+    if not top_holders:
+        return None
+
+    # Discovery already knows each token account's owner, so seed the owner cache for ingestion.
+    service.owner_resolver.remember({holder.address: holder.owner for holder in top_holders})
+
+    previous_balances = dict(
+        Wallet.objects.filter(address__in=[holder.address for holder in top_holders]).values_list('address', 'balance')
+    )
+
+    wallets_created = 0
+    wallets_updated = 0
+    for holder in top_holders:
+        _, created = Wallet.objects.update_or_create(
+            address=holder.address,
+            defaults={'balance': holder.amount, 'owner': holder.owner}
+        )
+        if created:
+            wallets_created += 1
+        else:
+            wallets_updated += 1
+
+    ensure_wallet_profiles(Wallet(address=holder.address) for holder in top_holders)
+    # New wallets are polled right away; wallets whose balance moved a lot are polled sooner.
+    ensure_poll_states(Wallet(address=holder.address) for holder in top_holders)
+    expedite_wallets(changed_balances(previous_balances, {holder.address: holder.amount for holder in top_holders}))
+    return wallets_created, wallets_updated
+
+
+def refresh_data(service, limit=None):
+    """
+    Runs the full data refresh: market data and top wallet discovery, then every tracked wallet
+    is made due for a poll, so the poll dispatcher fetches their transactions within its rate
+    limit. Afterwards API reads stay on the primary while replicas catch up.
+    Returns the (created, updated) wallet counts, or None if no holders could be retrieved.
+    """
+    service.get_solana_market_data()
+    result = update_top_wallets(service, limit=limit)
+    if result is None:
+        return None
+    make_all_wallets_due()
+    pin_reads_to_primary()
+    return result
+
+
+def update_wallet_transactions(service, wallets=None):
+    """
+    Fetches and stores new transactions for the given wallets (all tracked wallets by default),
+    one after the other, and reschedules each wallet's next poll from the result.
+    """
+    wallets = Wallet.objects.all() if wallets is None else wallets
+    for wallet in wallets:
+        try:
+            new_transactions = service.get_wallet_transactions(wallet.address)
+        except Exception as e:
+            print(f"Failed to fetch transactions for {wallet.address}: {e}")
+            new_transactions = None
+        record_poll(wallet.address, new_transactions)
+
+
+def ingest_enhanced_transactions(service, transactions_data):
+    """
+    Stores Helius enhanced transactions pushed by the webhook (or replayed from recordings).
+    Each transaction is attributed to the tracked wallets whose token account or owner takes
+    part in a transfer of the target token; transactions touching no tracked wallet are ignored.
+    Returns {wallet_address: number_of_new_transactions}.
+    """
+    mint = service.token_mint_address
+    involved = {}
+    for tx_data in transactions_data:
+        accounts = set()
+        for t in tx_data.get("tokenTransfers") or []:
+            if t.get("mint") == mint:
+                accounts.update(
+                    t.get(key) for key in
+                    ('fromTokenAccount', 'toTokenAccount', 'fromUserAccount', 'toUserAccount')
+                )
+        accounts.discard(None)
+        accounts.discard('')
+        if accounts and tx_data.get("signature"):
+            involved[tx_data["signature"]] = (accounts, tx_data)
+
+    if not involved:
+        return {}
+
+    all_accounts = set().union(*(accounts for accounts, _ in involved.values()))
+    wallets = Wallet.objects.filter(Q(address__in=all_accounts) | Q(owner__in=all_accounts))
+
+    stored = {}
+    for wallet in wallets:
+        keys = {wallet.address, wallet.owner} - {None}
+        wallet_transactions = [tx_data for accounts, tx_data in involved.values() if accounts & keys]
+        new_transactions = service.store_wallet_transactions(wallet, wallet_transactions)
+        stored[wallet.address] = len(new_transactions)
+    return stored
@@ -1,5 +1,12 @@
 from celery import shared_task
-from django.core.management import call_command
+from django.conf import settings
+from .analytics import export_snapshots
+from .services import get_solana_service, refresh_data, update_top_wallets, update_wallet_transactions
+from .scheduler import claim_due_wallets, ensure_poll_states, record_poll
+from .webhooks import drain_webhook_stream
+
+# Tasks call the service layer directly and share one SolanaService per worker process,
+# instead of building a new service (and its provider clients) through call_command on every run.
 
 
 @shared_task
@@ -7,22 +14,68 @@ def discover_wallets_task():
     """
     A Celery task to discover and update wallets.
     """
-    call_command('discover_wallets')
+    update_top_wallets(get_solana_service())
 
 @shared_task
 def discover_transactions_task():
     """
-    A Celery task to discover and store recent transactions for all tracked wallets.
+    A Celery task to discover and store recent transactions for all tracked wallets at once.
+    Scheduled polling goes through dispatch_wallet_polls_task instead.
+    """
+    update_wallet_transactions(get_solana_service())
+
+
+@shared_task
+def dispatch_wallet_polls_task():
+    """
+    A Celery task that queues a poll for every wallet that is due, most overdue first.
+    At most POLL_BATCH_SIZE wallets are dispatched per run, spread evenly over the run
+    interval, which caps the rate of calls to the provider.
+    """
+    ensure_poll_states()
+    due = claim_due_wallets(settings.POLL_BATCH_SIZE)
+    spacing = settings.POLL_DISPATCH_SECONDS / max(len(due), 1)
+    for i, address in enumerate(due):
+        poll_wallet_task.apply_async((address,), countdown=i * spacing)
+    if due:
+        print(f"Dispatched polls for {len(due)} wallets.")
+
+
+@shared_task
+def poll_wallet_task(wallet_address):
+    """
+    A Celery task to fetch one wallet's new transactions and schedule its next poll.
     """
-    call_command('discover_transactions')
+    new_transactions = get_solana_service().get_wallet_transactions(wallet_address)
+    record_poll(wallet_address, new_transactions)
 
 
 @shared_task
 def refresh_data_task():
     """
     A Celery task to run the full data refresh process.
-    This includes discovering wallets and their transactions.
+    This includes discovering wallets; their transactions are then polled by dispatch_wallet_polls_task.
     """
     print("Executing refresh_data_task...")
-    call_command('refresh_data')
+    if refresh_data(get_solana_service()) is None:
+        print("Could not retrieve token holders. Aborting refresh.")
+        return
     print("refresh_data_task finished.")
+
+
+@shared_task
+def export_snapshots_task():
+    """
+    A Celery task to write the missing or outdated Parquet snapshot partitions used by the analytics queries.
+    """
+    export_snapshots()
+
+
+@shared_task
+def consume_webhooks_task():
+    """
+    A Celery task to store the transactions delivered by the Helius webhook, in micro-batches.
+    """
+    entries, stored = drain_webhook_stream(get_solana_service())
+    if entries:
+        print(f"Consumed {entries} webhook deliveries, stored {stored} new transactions.")
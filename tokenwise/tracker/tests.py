@@ -1,3 +1,651 @@
-from django.test import TestCase
+import base64
+import json
+import os
+import tempfile
+from datetime import date, datetime, timedelta, timezone as dt_timezone
+from unittest import mock
+from django.conf import settings
+from django.http import HttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, override_settings
+from django.utils import timezone
+from . import clients, routers, webhooks
+from .analytics import export_transactions
+from .alerts import AlertEngine, LargeTransferRule, MemoryWindowStore, NetOutflowRule, NewProtocolRule, RedisWindowStore
+from cachetools import LRUCache
+from .holders import SPL_TOKEN_PROGRAM_ID, HeliusTokenAccountsSource, ProgramAccountsSource, rank_top_holders
+from .rpc import RecordedSolanaRpc, RpcError, b58encode, iter_json_array
+from .ingestion import persist_wallet_transactions
+from .middleware import CompressionMiddleware, ReplicaRoutingMiddleware
+from .renderers import render_response, to_columnar
+from .models import Alert, TokenAccountOwner, Transaction, Wallet, WalletPollState, WalletProfile
+from .owners import OwnerResolver
+from .scheduler import expedite_wallets, make_all_wallets_due, postpone_wallets
+from .services import SolanaService, update_wallet_transactions
+from .views import AsyncTransactionListView, HistoricalTransactionViewSet, TransactionViewSet, wallet_queryset
 
-# Create your tests here.
+MINT = '9BB6NFEcjBCtnNLFko2FqVQBq8HHM13kCyYcdQbgpump'
+
+
+def _chunks(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+def _owner(i):
+    return bytes([i % 256]) * 32
+
+
+def _program_account(i, amount):
+    """A getProgramAccounts item as returned with the owner/amount dataSlice."""
+    data = _owner(i) + amount.to_bytes(8, 'little')
+    return {'pubkey': f'account{i}', 'account': {'data': [base64.b64encode(data).decode(), 'base64']}}
+
+
+def _rpc_response(result):
+    return {'jsonrpc': '2.0', 'id': 1, 'result': result}
+
+
+class IterJsonArrayTests(SimpleTestCase):
+    document = json.dumps(_rpc_response([
+        {'pubkey': 'a', 'note': 'brackets ] [ and , commas'},
+        {'pubkey': 'b', 'note': 'escaped \\" quote and "result" key'},
+        {'pubkey': 'c', 'nested': {'list': [1, 2, [3]]}},
+    ]))
+
+    def test_decodes_items_across_any_chunk_split(self):
+        expected = json.loads(self.document)['result']
+        for size in (1, 2, 7, 64, len(self.document)):
+            with self.subTest(chunk_size=size):
+                self.assertEqual(list(iter_json_array(_chunks(self.document, size))), expected)
+
+    def test_empty_and_null_results(self):
+        self.assertEqual(list(iter_json_array(_chunks(json.dumps(_rpc_response([])), 3))), [])
+        self.assertEqual(list(iter_json_array(_chunks(json.dumps(_rpc_response(None)), 3))), [])
+
+    def test_error_response_raises(self):
+        body = json.dumps({'jsonrpc': '2.0', 'id': 1, 'error': {'code': -32600, 'message': 'bad'}})
+        with self.assertRaises(RpcError):
+            list(iter_json_array(_chunks(body, 5)))
+
+    def test_truncated_response_raises(self):
+        with self.assertRaises(RpcError):
+            list(iter_json_array(_chunks(self.document[:-40], 5)))
+
+
+class HolderDiscoveryTests(SimpleTestCase):
+    def _program_accounts_rpc(self, amounts, chunk_size=97):
+        accounts = [_program_account(i, amount) for i, amount in enumerate(amounts)]
+        return RecordedSolanaRpc({'getProgramAccounts': [_rpc_response(accounts)]}, chunk_size=chunk_size)
+
+    def test_ranks_beyond_the_largest_accounts_cap(self):
+        amounts = [(i * 7) % 151 + 1 for i in range(150)] + [0, 0]
+        rpc = self._program_accounts_rpc(amounts)
+
+        holders = rank_top_holders(ProgramAccountsSource(rpc, MINT), 50)
+
+        self.assertEqual(len(holders), 50)
+        self.assertEqual([h.amount for h in holders], sorted(amounts, reverse=True)[:50])
+        top = max(range(len(amounts)), key=amounts.__getitem__)
+        self.assertEqual(holders[0].address, f'account{top}')
+        self.assertEqual(holders[0].owner, b58encode(_owner(top)))
+
+    def test_limit_larger_than_number_of_accounts(self):
+        rpc = self._program_accounts_rpc([5, 0, 3])
+        holders = rank_top_holders(ProgramAccountsSource(rpc, MINT), 100)
+        self.assertEqual([(h.address, h.amount) for h in holders], [('account0', 5), ('account2', 3)])
+
+    def _helius_rpc(self, page_sizes):
+        pages = []
+        n = 0
+        for size in page_sizes:
+            accounts = [{'address': f'ta{n + i}', 'owner': f'owner{n + i}', 'amount': n + i + 1} for i in range(size)]
+            pages.append(_rpc_response({'total': size, 'limit': 2, 'token_accounts': accounts}))
+            n += size
+        return RecordedSolanaRpc({'getTokenAccounts': pages}, chunk_size=50)
+
+    def test_helius_paging_stops_at_a_short_page(self):
+        rpc = self._helius_rpc([2, 2, 1])
+        source = HeliusTokenAccountsSource(rpc, MINT)
+        source.page_size = 2
+
+        accounts = list(source)
+
+        self.assertEqual([a[0] for a in accounts], ['ta0', 'ta1', 'ta2', 'ta3', 'ta4'])
+        self.assertEqual([params['page'] for _, params in rpc.calls], [1, 2, 3])
+
+    def test_helius_paging_stops_at_an_empty_page(self):
+        rpc = self._helius_rpc([2, 2, 0])
+        source = HeliusTokenAccountsSource(rpc, MINT)
+        source.page_size = 2
+
+        self.assertEqual(len(list(source)), 4)
+        self.assertEqual(len(rpc.calls), 3)
+
+    @override_settings(HOLDER_DISCOVERY_SOURCE='program-accounts')
+    def test_service_uses_the_given_rpc(self):
+        rpc = self._program_accounts_rpc(range(1, 31))
+
+        holders = SolanaService(rpc=rpc).get_top_token_holders(limit=25)
+
+        self.assertEqual(len(holders), 25)
+        self.assertEqual(holders[0].amount, 30)
+        method, params = rpc.calls[0]
+        self.assertEqual(method, 'getProgramAccounts')
+        self.assertEqual(params[1]['filters'][1]['memcmp']['bytes'], MINT)
+
+
+def _token_account_info(i):
+    """A getMultipleAccounts value for a token account, sliced to its owner field."""
+    return {'owner': SPL_TOKEN_PROGRAM_ID, 'data': [base64.b64encode(_owner(i)).decode(), 'base64']}
+
+
+class OwnerResolverTests(TestCase):
+    def _rpc(self, batch_sizes):
+        # The last account of every batch is a plain wallet, not a token account.
+        pages = [
+            _rpc_response({'value': [_token_account_info(i) for i in range(size - 1)] + [None]})
+            for size in batch_sizes
+        ]
+        return RecordedSolanaRpc({'getMultipleAccounts': pages})
+
+    def test_batches_calls_and_serves_repeats_from_the_cache_and_the_table(self):
+        accounts = [f'account{i}' for i in range(250)]
+        rpc = self._rpc([100, 100, 50])
+        resolver = OwnerResolver(rpc=rpc, cache=LRUCache(maxsize=1000))
+
+        owners = resolver.resolve(accounts)
+
+        self.assertEqual([len(params[0]) for _, params in rpc.calls], [100, 100, 50])
+        self.assertEqual(len(owners), 247)
+        self.assertEqual(TokenAccountOwner.objects.count(), 247)
+
+        # Plain wallets are remembered as not being token accounts.
+        self.assertEqual(resolver.resolve(accounts), owners)
+        self.assertEqual(len(rpc.calls), 3)
+
+        # A cold LRU is refilled from the TokenAccountOwner table.
+        cold = OwnerResolver(rpc=rpc, cache=LRUCache(maxsize=1000))
+        self.assertEqual(cold.resolve(list(owners)), owners)
+        self.assertEqual(len(rpc.calls), 3)
+
+
+class WalletOrderingTests(TestCase):
+    def setUp(self):
+        for address, last_activity in (('active-old', 1), ('never-active', None), ('active-new', 2)):
+            wallet = Wallet.objects.create(address=address, balance=1)
+            WalletProfile.objects.create(
+                wallet=wallet,
+                last_activity=None if last_activity is None else datetime(2025, 1, last_activity, tzinfo=dt_timezone.utc),
+            )
+
+    def test_wallets_without_activity_sort_last(self):
+        for ordering, expected in (
+            ('-last_activity', ['active-new', 'active-old', 'never-active']),
+            ('last_activity', ['active-old', 'active-new', 'never-active']),
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertEqual([w.address for w in wallet_queryset({'ordering': ordering})], expected)
+
+    def test_profile_columns_order_with_ties_broken_by_address(self):
+        WalletProfile.objects.filter(wallet_id='active-new').update(net_flow=5)
+        WalletProfile.objects.filter(wallet_id='never-active').update(net_flow=-5)
+        for ordering, expected in (
+            ('-net_flow', ['active-new', 'active-old', 'never-active']),
+            ('net_flow', ['never-active', 'active-old', 'active-new']),
+            ('-balance', ['active-new', 'active-old', 'never-active']),
+        ):
+            with self.subTest(ordering=ordering):
+                self.assertEqual([w.address for w in wallet_queryset({'ordering': ordering})], expected)
+
+
+@override_settings(ALERT_WINDOW_BACKEND='memory')
+class WalletProfileTests(TestCase):
+    def test_profile_totals_match_stored_amounts(self):
+        wallet = Wallet.objects.create(address='wallet', balance=0)
+        timestamp = datetime(2025, 1, 1, tzinfo=dt_timezone.utc)
+        transactions = [
+            Transaction(signature='buy', wallet=wallet, timestamp=timestamp, transaction_type='BUY', amount=10.7),
+            Transaction(signature='sell', wallet=wallet, timestamp=timestamp, transaction_type='SELL', amount=2.6),
+        ]
+
+        persist_wallet_transactions(wallet, transactions)
+
+        profile = WalletProfile.objects.get(wallet=wallet)
+        stored = {tx.signature: tx.amount for tx in Transaction.objects.filter(wallet=wallet)}
+        self.assertEqual((profile.total_bought, profile.total_sold), (stored['buy'], stored['sell']))
+
+
+class AlertEngineTests(TestCase):
+    def setUp(self):
+        self.wallet = Wallet.objects.create(address='wallet', balance=10_000_000 * 10**6)
+        self.engine = AlertEngine(
+            [LargeTransferRule(min_amount=1000, min_balance_share=0.5), NetOutflowRule(threshold=1500, window_seconds=3600),
+             NewProtocolRule()],
+            MemoryWindowStore(),
+            max_age_seconds=3600,
+        )
+
+    def _transactions(self, age, protocols=('JUPITER', 'RAYDIUM', 'ORCA'), transaction_type='BUY'):
+        timestamp = timezone.now() - age
+        return Transaction.objects.bulk_create([
+            Transaction(signature=f'{transaction_type}{age.days}-{i}', wallet=self.wallet,
+                        timestamp=timestamp + timedelta(seconds=i), transaction_type=transaction_type,
+                        amount=2000, protocol=protocol)
+            for i, protocol in enumerate(protocols)
+        ])
+
+    def test_a_wallets_backfilled_history_raises_no_alerts(self):
+        profile = WalletProfile(wallet=self.wallet)
+        self.assertEqual(self.engine.evaluate(self.wallet, profile, self._transactions(timedelta(seconds=60))), [])
+
+    def test_old_transactions_raise_no_alerts(self):
+        profile = WalletProfile(wallet=self.wallet, tx_count=5, protocol_counts={'JUPITER': 5})
+        self.assertEqual(self.engine.evaluate(self.wallet, profile, self._transactions(timedelta(days=365))), [])
+
+    def test_recent_transactions_of_an_active_wallet_raise_alerts(self):
+        profile = WalletProfile(wallet=self.wallet, tx_count=5, protocol_counts={'JUPITER': 5})
+        transactions = (
+            self._transactions(timedelta(days=365), protocols=('RAYDIUM',))
+            + self._transactions(timedelta(seconds=60), protocols=('RAYDIUM', 'ORCA'), transaction_type='SELL')
+        )
+
+        alerts = self.engine.evaluate(self.wallet, profile, transactions)
+
+        self.assertEqual(
+            sorted((alert.rule, alert.transaction.signature) for alert in alerts),
+            [('LARGE_TRANSFER', 'SELL0-0'), ('LARGE_TRANSFER', 'SELL0-1'), ('NET_OUTFLOW', 'SELL0-0'), ('NEW_PROTOCOL', 'SELL0-1')],
+        )
+        self.assertEqual(Alert.objects.count(), 4)
+
+
+def _lua_redis():
+    """A Redis that can run scripts: TEST_REDIS_URL if set, else fakeredis with Lua support."""
+    url = os.environ.get('TEST_REDIS_URL')
+    if url:
+        import redis
+        return redis.Redis.from_url(url)
+    try:
+        import fakeredis
+        import lupa  # noqa: F401  (fakeredis runs EVAL through lupa)
+    except ImportError:
+        return None
+    return fakeredis.FakeRedis()
+
+
+class WindowStoreTests:
+    """Shared behaviour of the sliding-window stores; `make_store` builds a fresh one."""
+
+    def test_sums_events_in_window(self):
+        store = self.make_store()
+        self.assertEqual(store.add('w', 0, 'a', 5, 60), (0, 5))
+        self.assertEqual(store.add('w', 10, 'b', -3, 60), (5, 2))
+
+    def test_re_adding_a_member_is_idempotent(self):
+        store = self.make_store()
+        store.add('w', 0, 'a', 5, 60)
+        self.assertEqual(store.add('w', 0, 'a', 5, 60), (5, 5))
+        self.assertEqual(store.add('w', 5, 'b', 1, 60), (5, 6))
+
+    def test_evicts_events_older_than_the_window(self):
+        store = self.make_store()
+        store.add('w', 0, 'a', 5, 60)
+        store.add('w', 10, 'b', -3, 60)
+        self.assertEqual(store.add('w', 65, 'c', 1, 60), (2, -2))
+        self.assertEqual(store.add('w', 200, 'd', 4, 60), (-2, 4))
+
+    def test_wallets_are_independent(self):
+        store = self.make_store()
+        store.add('w1', 0, 'a', 5, 60)
+        self.assertEqual(store.add('w2', 0, 'a', 7, 60), (0, 7))
+
+    def test_add_many_matches_adding_one_by_one(self):
+        events = [(0, 'a', 5), (10, 'b', -3), (10, 'b', -3), (65, 'c', 1), (200, 'd', 4)]
+        one_by_one = self.make_store()
+        expected = [one_by_one.add('w', *event, 60) for event in events]
+        self.assertEqual(self.make_store().add_many('other', events, 60), expected)
+
+
+class MemoryWindowStoreTests(WindowStoreTests, SimpleTestCase):
+    def make_store(self):
+        return MemoryWindowStore()
+
+
+class RedisWindowStoreTests(WindowStoreTests, SimpleTestCase):
+    def setUp(self):
+        self.client = _lua_redis()
+        if self.client is None:
+            self.skipTest('Needs TEST_REDIS_URL or fakeredis with lupa to run the window script.')
+        self.client.flushdb()
+
+    def make_store(self):
+        return RedisWindowStore(self.client)
+
+
+@override_settings(DATABASE_REPLICAS=['replica_1'])
+class ReplicaRoutingTests(SimpleTestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('Needs fakeredis.')
+        self.redis = fakeredis.FakeRedis()
+        patcher = mock.patch.object(routers, '_pin_client', return_value=self.redis)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        routers._pin.update(until=0.0, checked=0.0)
+        self.middleware = ReplicaRoutingMiddleware(lambda request: None)
+
+    def _alias(self, method='get', path='/api/wallets/'):
+        request = getattr(RequestFactory(), method)(path)
+        return self.middleware._read_alias(request)
+
+    def test_reads_go_to_a_replica_and_writes_to_the_primary(self):
+        self.assertEqual(self._alias('get'), 'replica_1')
+        self.assertEqual(self._alias('post'), routers.PRIMARY_DB)
+
+    def test_only_api_reads_go_to_a_replica(self):
+        self.assertEqual(self._alias('get', '/admin/'), routers.PRIMARY_DB)
+        self.assertEqual(self._alias('get', '/admin/login/'), routers.PRIMARY_DB)
+
+    async def test_async_requests_are_routed_the_same_way(self):
+        async def get_response(request):
+            return routers._read_alias.get()
+
+        middleware = ReplicaRoutingMiddleware(get_response)
+        self.assertEqual(await middleware(RequestFactory().get('/api/wallets/')), 'replica_1')
+        self.assertEqual(await middleware(RequestFactory().get('/admin/')), routers.PRIMARY_DB)
+        routers.pin_reads_to_primary(60)
+        routers._pin['checked'] = 0.0
+        self.assertEqual(await middleware(RequestFactory().get('/api/wallets/')), routers.PRIMARY_DB)
+
+    def test_reads_stay_on_the_primary_after_a_refresh(self):
+        routers.pin_reads_to_primary(60)
+        routers._pin['checked'] = 0.0
+        self.assertEqual(self._alias('get'), routers.PRIMARY_DB)
+
+        self.redis.delete(routers.PRIMARY_PIN_KEY)
+        routers._pin['checked'] = 0.0
+        self.assertEqual(self._alias('get'), 'replica_1')
+
+
+class TransactionExportTests(TestCase):
+    def setUp(self):
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            self.skipTest('Needs pyarrow.')
+        snapshot_dir = tempfile.TemporaryDirectory()
+        self.addCleanup(snapshot_dir.cleanup)
+        settings_override = override_settings(ANALYTICS_SNAPSHOT_DIR=snapshot_dir.name)
+        settings_override.enable()
+        self.addCleanup(settings_override.disable)
+        self.wallet = Wallet.objects.create(address='wallet', balance=0)
+
+    def _store(self, signature, day):
+        Transaction.objects.create(
+            signature=signature, wallet=self.wallet, transaction_type='BUY', amount=1,
+            timestamp=datetime(2025, 1, day, 12, tzinfo=dt_timezone.utc),
+        )
+
+    def _exported_signatures(self, day):
+        import pyarrow.parquet as pq
+        path = os.path.join(settings.ANALYTICS_SNAPSHOT_DIR, 'transactions', f'dt=2025-01-{day:02d}', 'part-0.parquet')
+        return sorted(pq.read_table(path).column('signature').to_pylist())
+
+    def test_late_rows_for_an_exported_day_are_exported(self):
+        self._store('early', 1)
+        self.assertEqual(export_transactions(today=date(2025, 1, 3)), {date(2025, 1, 1): 1, date(2025, 1, 2): 0})
+
+        self._store('late', 1)
+        exported = export_transactions(today=date(2025, 1, 3))
+
+        self.assertEqual(exported[date(2025, 1, 1)], 2)
+        self.assertNotIn(date(2025, 1, 2), exported)
+        self.assertEqual(self._exported_signatures(1), ['early', 'late'])
+
+
+@override_settings(TRANSACTION_COUNT_CAP=5)
+class TransactionListTests(TestCase):
+    def setUp(self):
+        wallet = Wallet.objects.create(address='walletaddress', balance=0)
+        Transaction.objects.bulk_create([
+            Transaction(signature=f'sig{i}', wallet=wallet, transaction_type='BUY', amount=i,
+                        timestamp=datetime(2025, 1, 1, i, tzinfo=dt_timezone.utc))
+            for i in range(8)
+        ])
+
+    def _list(self, **params):
+        request = RequestFactory().get('/api/transactions/', params)
+        return TransactionViewSet.as_view({'get': 'list'})(request)
+
+    def test_short_partial_addresses_are_rejected(self):
+        for name in ('wallet_prefix', 'wallet_contains'):
+            with self.subTest(name=name):
+                response = self._list(**{name: 'wa'})
+                self.assertEqual(response.status_code, 400)
+                self.assertIn(name, response.data)
+        self.assertEqual(self._list(wallet_contains='let').data['count'], 5)
+
+    def test_count_is_capped(self):
+        response = self._list(page_size=2)
+        self.assertEqual(response.data['count'], 5)
+        self.assertEqual(len(response.data['results']), 2)
+        self.assertEqual(self._list(min_amount=6).data['count'], 2)
+
+    def test_a_capped_list_pages_to_its_end_through_next(self):
+        signatures = []
+        url = '/api/transactions/?page_size=3'
+        while url:
+            response = TransactionViewSet.as_view({'get': 'list'})(RequestFactory().get(url))
+            self.assertEqual(response.data['count'], 5)
+            signatures += [row['signature'] for row in response.data['results']]
+            url = response.data['next']
+        self.assertEqual(signatures, [f'sig{i}' for i in reversed(range(8))])
+        self.assertEqual(self._list(page_size=3, page=4).status_code, 404)
+
+    def test_historical_transactions_are_not_capped(self):
+        request = RequestFactory().get('/api/historical-transactions/')
+        response = HistoricalTransactionViewSet.as_view({'get': 'list'})(request)
+        self.assertEqual(response.data['count'], 8)
+
+    async def test_async_list_caps_the_count_and_rejects_short_values(self):
+        view = AsyncTransactionListView.as_view()
+        response = await view(RequestFactory().get('/api/transactions/', {'page_size': 2}))
+        self.assertEqual(json.loads(response.content)['count'], 5)
+        response = await view(RequestFactory().get('/api/transactions/', {'wallet_prefix': 'w'}))
+        self.assertEqual(response.status_code, 400)
+
+    async def test_async_capped_list_pages_to_its_end_through_next(self):
+        view = AsyncTransactionListView.as_view()
+        signatures = []
+        url = '/api/transactions/?page_size=3'
+        while url:
+            page = json.loads((await view(RequestFactory().get(url))).content)
+            signatures += [row['signature'] for row in page['results']]
+            url = page['next']
+        self.assertEqual(len(signatures), 8)
+        response = await view(RequestFactory().get('/api/transactions/', {'page_size': 3, 'page': 4}))
+        self.assertEqual(response.status_code, 404)
+
+
+def _enhanced_transaction(signature, to_account='wallet', **fields):
+    return {
+        'signature': signature,
+        'timestamp': 1735732800,
+        'tokenTransfers': [{'mint': MINT, 'fromUserAccount': 'seller', 'toUserAccount': to_account, 'tokenAmount': 5}],
+        **fields,
+    }
+
+
+class ParsePayloadTests(SimpleTestCase):
+    def test_invalid_transactions_are_rejected(self):
+        payload = [
+            _enhanced_transaction('good'),
+            _enhanced_transaction('no-timestamp', timestamp=None),
+            _enhanced_transaction('string-timestamp', timestamp='yesterday'),
+            _enhanced_transaction('bad-transfers', tokenTransfers={'mint': MINT}),
+            {'timestamp': 1735732800},
+            'not an object',
+        ]
+        transactions, rejected = webhooks.parse_payload(json.dumps(payload))
+        self.assertEqual([tx['signature'] for tx in transactions], ['good'])
+        self.assertEqual(rejected, 5)
+
+    def test_null_optional_fields_are_normalised(self):
+        transactions, rejected = webhooks.parse_payload(
+            json.dumps(_enhanced_transaction('sig', tokenTransfers=None, events=None, description=None))
+        )
+        self.assertEqual(rejected, 0)
+        self.assertEqual(
+            (transactions[0]['tokenTransfers'], transactions[0]['events'], transactions[0]['description']), ([], {}, '')
+        )
+
+    def test_non_array_body_raises(self):
+        with self.assertRaises(ValueError):
+            webhooks.parse_payload('"text"')
+
+
+class _StubService:
+    """Stores webhook transactions without the provider, failing for the 'poison' signature."""
+    token_mint_address = MINT
+
+    def store_wallet_transactions(self, wallet, transactions_data):
+        if any(tx['signature'] == 'poison' for tx in transactions_data):
+            raise RuntimeError('cannot store poison')
+        return transactions_data
+
+
+@override_settings(WEBHOOK_STREAM='test:webhooks', WEBHOOK_DEAD_LETTER_STREAM='test:webhooks:dead', WEBHOOK_MAX_DELIVERIES=2)
+class WebhookConsumerTests(TestCase):
+    def setUp(self):
+        try:
+            import fakeredis
+        except ImportError:
+            self.skipTest('Needs fakeredis.')
+        self.redis = fakeredis.FakeRedis()
+        clients._clients[f'redis:{settings.WEBHOOK_REDIS_URL}'] = self.redis
+        self.addCleanup(clients._clients.clear)
+        Wallet.objects.create(address='wallet', balance=0)
+
+    def _enqueue(self, signature):
+        webhooks.enqueue_payload(json.dumps([_enhanced_transaction(signature)]))
+
+    def _pending(self):
+        return self.redis.xpending(settings.WEBHOOK_STREAM, webhooks.CONSUMER_GROUP)['pending']
+
+    def test_a_failing_entry_does_not_block_the_batch(self):
+        for signature in ('first', 'poison', 'second'):
+            self._enqueue(signature)
+
+        entries, stored = webhooks.consume_webhook_batch(_StubService())
+
+        self.assertEqual((entries, stored), (3, {'wallet': 2}))
+        self.assertEqual(self._pending(), 1)
+
+    def test_entries_failing_too_often_are_dead_lettered(self):
+        self._enqueue('poison')
+        with mock.patch.object(webhooks, 'RECLAIM_IDLE_MS', 0):
+            for _ in range(settings.WEBHOOK_MAX_DELIVERIES + 1):
+                webhooks.consume_webhook_batch(_StubService())
+
+        self.assertEqual(self._pending(), 0)
+        [(_, fields)] = self.redis.xrange(settings.WEBHOOK_DEAD_LETTER_STREAM)
+        self.assertIn(b'poison', fields[b'payload'])
+        self.assertEqual(int(fields[b'deliveries']), settings.WEBHOOK_MAX_DELIVERIES + 1)
+
+
+class PollSchedulingTests(TestCase):
+    def setUp(self):
+        self.now = timezone.now()
+        wallet = Wallet.objects.create(address='wallet', balance=0)
+        WalletPollState.objects.create(wallet=wallet, next_poll_at=self.now + timedelta(minutes=10), interval_seconds=3600)
+
+    def _state(self):
+        return WalletPollState.objects.get(wallet_id='wallet')
+
+    def test_webhook_activity_postpones_the_next_poll(self):
+        postpone_wallets(['wallet'])
+        state = self._state()
+        self.assertEqual(state.interval_seconds, 3600)
+        self.assertGreaterEqual(state.next_poll_at, self.now + timedelta(seconds=0.9 * 3600))
+        self.assertIsNotNone(state.last_activity_at)
+
+    def test_a_refresh_makes_wallets_due_without_resetting_intervals(self):
+        make_all_wallets_due()
+        state = self._state()
+        self.assertLessEqual(state.next_poll_at, timezone.now())
+        self.assertEqual(state.interval_seconds, 3600)
+
+    def test_polling_every_wallet_reschedules_each_of_them(self):
+        service = mock.Mock(**{'get_wallet_transactions.return_value': 2})
+        update_wallet_transactions(service)
+        state = self._state()
+        self.assertEqual(state.interval_seconds, settings.POLL_MIN_INTERVAL_SECONDS)
+        self.assertIsNotNone(state.last_polled_at)
+
+    def test_balance_changes_expedite_the_next_poll(self):
+        expedite_wallets(['wallet'])
+        state = self._state()
+        self.assertEqual(state.interval_seconds, settings.POLL_MIN_INTERVAL_SECONDS)
+        self.assertLessEqual(state.next_poll_at, timezone.now() + timedelta(seconds=settings.POLL_MIN_INTERVAL_SECONDS))
+
+
+class RendererTests(TestCase):
+    page = {'count': 2, 'next': None, 'previous': None, 'results': [{'a': 1, 'b': 'x'}, {'a': 2, 'b': 'y'}]}
+
+    def test_columnar_layout(self):
+        self.assertEqual(to_columnar(self.page), {
+            'count': 2, 'next': None, 'previous': None,
+            'columns': ['a', 'b'], 'results': {'a': [1, 2], 'b': ['x', 'y']},
+        })
+        self.assertEqual(to_columnar({'detail': 'x'}), {'detail': 'x'})
+
+    def test_render_response_negotiates_the_format(self):
+        for params, accept, content_type in (
+            ({}, '', 'application/json'),
+            ({}, 'application/msgpack', 'application/msgpack'),
+            ({}, 'application/vnd.tokenwise.columnar+json', 'application/vnd.tokenwise.columnar+json'),
+            ({'format': 'msgpack'}, 'application/json', 'application/msgpack'),
+            ({'format': 'columnar'}, '', 'application/vnd.tokenwise.columnar+json'),
+        ):
+            with self.subTest(params=params, accept=accept):
+                request = RequestFactory().get('/api/transactions/', params, HTTP_ACCEPT=accept)
+                response = render_response(request, self.page)
+                self.assertEqual(response['Content-Type'], content_type)
+                self.assertEqual(response['Vary'], 'Accept')
+        response = render_response(RequestFactory().get('/', {'format': 'columnar'}), self.page)
+        self.assertEqual(json.loads(response.content)['results'], {'a': [1, 2], 'b': ['x', 'y']})
+
+    def test_drf_views_negotiate_the_format(self):
+        Wallet.objects.create(address='wallet', balance=1)
+        view = TransactionViewSet.as_view({'get': 'list'})
+        for params, accept, content_type in (
+            ({}, 'application/json', 'application/json'),
+            ({}, 'application/msgpack', 'application/msgpack'),
+            ({'format': 'columnar'}, '*/*', 'application/vnd.tokenwise.columnar+json'),
+        ):
+            with self.subTest(params=params, accept=accept):
+                response = view(RequestFactory().get('/api/transactions/', params, HTTP_ACCEPT=accept)).render()
+                self.assertEqual(response['Content-Type'], content_type)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    body = json.dumps([{'signature': f'{i:088d}', 'amount': i} for i in range(50)]).encode()
+
+    def _response(self, accept_encoding, content_type='application/json'):
+        middleware = CompressionMiddleware(lambda request: HttpResponse(self.body, content_type=content_type))
+        return middleware(RequestFactory().get('/api/transactions/', HTTP_ACCEPT_ENCODING=accept_encoding))
+
+    def test_encoding_follows_accept_encoding(self):
+        try:
+            import brotli  # noqa: F401
+        except ImportError:
+            self.skipTest('Needs brotli.')
+        for accept_encoding, encoding in (('gzip, deflate, br', 'br'), ('gzip', 'gzip'), ('', None)):
+            with self.subTest(accept_encoding=accept_encoding):
+                response = self._response(accept_encoding)
+                self.assertEqual(response.get('Content-Encoding'), encoding)
+                self.assertIn('Accept-Encoding', response['Vary'])
+
+    def test_html_is_never_brotli_compressed(self):
+        response = self._response('gzip, br', content_type='text/html; charset=utf-8')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
@@ -1,12 +1,23 @@
+from django.conf import settings
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from .views import (
     WalletViewSet,
     TransactionViewSet,
     HistoricalTransactionViewSet,
+    AlertViewSet,
     DashboardMetricsView,
     RefreshDataView,
     SolanaStatsView,
+    AnalyticsQueryView,
+    HeliusWebhookView,
+    AsyncWalletListView,
+    AsyncWalletDetailView,
+    AsyncTransactionListView,
+    AsyncTransactionDetailView,
+    AsyncHistoricalTransactionListView,
+    AsyncDashboardMetricsView,
+    AsyncSolanaStatsView,
 )
 
 # Create a router and register our viewsets with it.
@@ -14,6 +25,7 @@ router = DefaultRouter()
 router.register(r'wallets', WalletViewSet, basename='wallet')
 router.register(r'transactions', TransactionViewSet, basename='transaction')
 router.register(r'historical-transactions', HistoricalTransactionViewSet, basename='historical-transaction')
+router.register(r'alerts', AlertViewSet, basename='alert')
 
 # The API URLs are now determined automatically by the router.
 urlpatterns = [
@@ -21,4 +33,19 @@ urlpatterns = [
     path('dashboard-metrics/', DashboardMetricsView.as_view(), name='dashboard-metrics'),
     path('refresh-data/', RefreshDataView.as_view(), name='refresh-data'),
     path('solana-stats/', SolanaStatsView.as_view(), name='solana-stats'),
+    path('analytics/query/', AnalyticsQueryView.as_view(), name='analytics-query'),
+    path('webhooks/helius/', HeliusWebhookView.as_view(), name='helius-webhook'),
 ]
+
+# Under ASGI the read endpoints are served by their native async implementations.
+# They are matched before the router, so writes and the API root still go through DRF.
+if settings.ASYNC_READ_VIEWS:
+    urlpatterns = [
+        path('wallets/', AsyncWalletListView.as_view(), name='wallet-list'),
+        path('wallets/<str:address>/', AsyncWalletDetailView.as_view(), name='wallet-detail'),
+        path('transactions/', AsyncTransactionListView.as_view(), name='transaction-list'),
+        path('transactions/<str:signature>/', AsyncTransactionDetailView.as_view(), name='transaction-detail'),
+        path('historical-transactions/', AsyncHistoricalTransactionListView.as_view(), name='historical-transaction-list'),
+        path('dashboard-metrics/', AsyncDashboardMetricsView.as_view(), name='dashboard-metrics'),
+        path('solana-stats/', AsyncSolanaStatsView.as_view(), name='solana-stats'),
+    ] + urlpatterns
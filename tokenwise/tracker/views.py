@@ -1,34 +1,252 @@
+import asyncio
+import json
+from datetime import datetime, timedelta
 from rest_framework import viewsets, views
+from rest_framework.decorators import action
+from rest_framework.exceptions import ValidationError
 from rest_framework.response import Response
 from rest_framework.pagination import PageNumberPagination
-from django.db.models import Sum, Q, Count
+from django.conf import settings
+from django.contrib.postgres.search import SearchQuery
+from django.core.paginator import EmptyPage, Page, PageNotAnInteger, Paginator
+from django.db.models import F, Sum, Q, Count
+from django.utils.functional import cached_property
 from .tasks import refresh_data_task
+from .analytics import PRESETS, AnalyticsError, run_preset
+from .renderers import render_response
+from .webhooks import enqueue_payload, parse_payload, verify_webhook_secret
 from django.http import JsonResponse
+from django.views import View
+from rest_framework.utils.urls import remove_query_param, replace_query_param
 from rest_framework import status
 import requests
 from django.core.cache import cache
-from .models import Wallet, Transaction, SolanaMetric
-from .serializers import WalletSerializer, TransactionSerializer, HistoricalTransactionSerializer
+from .models import Wallet, Transaction, SolanaMetric, WalletProfile, Alert
+from .serializers import (
+    WalletSerializer,
+    WalletProfileSerializer,
+    TransactionSerializer,
+    HistoricalTransactionSerializer,
+    AlertSerializer,
+)
 import logging
 
 
+# Public `?ordering=` names for the wallet list, mapped to (indexed) model fields.
+WALLET_ORDERING_FIELDS = {
+    'balance': 'balance',
+    'net_flow': 'profile__net_flow',
+    'total_bought': 'profile__total_bought',
+    'total_sold': 'profile__total_sold',
+    'tx_count': 'profile__tx_count',
+    'last_activity': 'profile__last_activity',
+}
+
+
+def wallet_queryset(params):
+    """
+    Wallets with their profile summary, ordered by the `ordering` query parameter
+    (e.g. `?ordering=-net_flow` for the top net buyers). Defaults to `-balance`.
+    """
+    ordering = params.get('ordering') or '-balance'
+    name = ordering.lstrip('-')
+    field = WALLET_ORDERING_FIELDS.get(name)
+    if field is None:
+        ordering, name, field = '-balance', 'balance', 'balance'
+    descending = ordering.startswith('-')
+    if name == 'last_activity':
+        # Wallets without activity yet sort last either way (see profile_last_activity_desc_idx).
+        order = F(field).desc(nulls_last=True) if descending else F(field).asc(nulls_last=True)
+    else:
+        order = F(field).desc() if descending else F(field).asc()
+
+    queryset = Wallet.objects.select_related('profile')
+    if field.startswith('profile__'):
+        # Every tracked wallet has a profile (see ensure_wallet_profiles). An inner join lets
+        # the planner walk the profile column's index instead of sorting every wallet.
+        queryset = queryset.filter(profile__isnull=False)
+    return queryset.order_by(order, 'address')
+
+
+def _parse_amount(params, name):
+    value = params.get(name)
+    if value in (None, ''):
+        return None
+    try:
+        return int(value)
+    except ValueError:
+        raise ValidationError({name: 'Must be an integer.'})
+
+
+# Trigrams are three characters long, so shorter substrings cannot use the trigram index
+# and would scan every transaction.
+MIN_PARTIAL_ADDRESS_LENGTH = 3
+
+
+def _parse_partial_address(params, name):
+    value = params.get(name)
+    if value and len(value) < MIN_PARTIAL_ADDRESS_LENGTH:
+        raise ValidationError({name: f'Must be at least {MIN_PARTIAL_ADDRESS_LENGTH} characters.'})
+    return value
+
+
+def filter_transactions(queryset, params):
+    """
+    Applies the search and filter query parameters shared by the transaction endpoints:
+    - `q`: full-text search on the description (web search syntax, e.g. `swapped -jupiter`)
+    - `wallet`: exact wallet address
+    - `wallet_prefix` / `wallet_contains`: partial wallet address, at least 3 characters
+    - `protocol`, `type`: one or more comma-separated values
+    - `min_amount`, `max_amount`: inclusive amount range
+    Each filter is served by an index on Transaction.
+    """
+    # Filter by wallet address if the 'wallet' query parameter is provided
+    wallet_address = params.get('wallet')
+    if wallet_address:
+        queryset = queryset.filter(wallet_id=wallet_address)
+    wallet_prefix = _parse_partial_address(params, 'wallet_prefix')
+    if wallet_prefix:
+        queryset = queryset.filter(wallet__address__startswith=wallet_prefix)
+    wallet_contains = _parse_partial_address(params, 'wallet_contains')
+    if wallet_contains:
+        queryset = queryset.filter(wallet__address__contains=wallet_contains)
+
+    protocols = [p for p in params.get('protocol', '').split(',') if p]
+    if protocols:
+        queryset = queryset.filter(protocol__in=protocols)
+    transaction_types = [t.upper() for t in params.get('type', '').split(',') if t]
+    if transaction_types:
+        queryset = queryset.filter(transaction_type__in=transaction_types)
+
+    min_amount = _parse_amount(params, 'min_amount')
+    if min_amount is not None:
+        queryset = queryset.filter(amount__gte=min_amount)
+    max_amount = _parse_amount(params, 'max_amount')
+    if max_amount is not None:
+        queryset = queryset.filter(amount__lte=max_amount)
+
+    search = params.get('q')
+    if search:
+        queryset = queryset.filter(search_vector=SearchQuery(search, search_type='websearch', config='english'))
+
+    return queryset
+
+
+def transaction_queryset(params):
+    """Transactions ordered by timestamp, narrowed by the search/filter query parameters."""
+    # The tsvector is only needed for matching, never in responses.
+    queryset = Transaction.objects.defer('search_vector').order_by('-timestamp')
+    return filter_transactions(queryset, params)
+
+
+def historical_transaction_queryset(params):
+    """
+    Transactions ordered by timestamp, restricted to the `start_date`/`end_date` query parameters
+    and narrowed by the search/filter query parameters.
+    """
+    queryset = filter_transactions(Transaction.objects.defer('search_vector').order_by('-timestamp'), params)
+    start_date = params.get('start_date')
+    end_date = params.get('end_date')
+
+    if start_date:
+        queryset = queryset.filter(timestamp__gte=start_date)
+    if end_date:
+        # Add 1 day to the end_date to make it inclusive
+        end_date_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
+        queryset = queryset.filter(timestamp__lt=end_date_dt)
+
+    return queryset
+
+
 class StandardResultsSetPagination(PageNumberPagination):
     page_size = 10
     page_size_query_param = 'page_size'
     max_page_size = 100
 
 
+class _OpenEndedPage(Page):
+    """A page of a list whose length is unknown; whether more rows follow was fetched with it."""
+
+    def __init__(self, object_list, number, paginator, has_more):
+        super().__init__(object_list, number, paginator)
+        self.has_more = has_more
+
+    def has_next(self):
+        return self.has_more
+
+
+class CappedCountPaginator(Paginator):
+    """
+    Counts at most TRANSACTION_COUNT_CAP rows, so a broad search does not cost a full
+    COUNT(*) over the matching transactions. Past the cap, `count` stays at the cap and each
+    page fetches one extra row to tell whether another page follows, so `next` still leads
+    to the end of the list.
+    """
+
+    @cached_property
+    def _counted(self):
+        return self.object_list[:settings.TRANSACTION_COUNT_CAP + 1].count()
+
+    @property
+    def capped(self):
+        return self._counted > settings.TRANSACTION_COUNT_CAP
+
+    @cached_property
+    def count(self):
+        return min(self._counted, settings.TRANSACTION_COUNT_CAP)
+
+    def validate_number(self, number):
+        if not self.capped:
+            return super().validate_number(number)
+        # The last page is unknown, so only the lower bound is checked here; see page().
+        try:
+            number = int(number)
+        except (TypeError, ValueError):
+            raise PageNotAnInteger(self.error_messages['invalid_page'])
+        if number < 1:
+            raise EmptyPage(self.error_messages['min_page'])
+        return number
+
+    def page(self, number):
+        if not self.capped:
+            return super().page(number)
+        number = self.validate_number(number)
+        bottom = (number - 1) * self.per_page
+        rows = list(self.object_list[bottom:bottom + self.per_page + 1])
+        if not rows:
+            raise EmptyPage(self.error_messages['no_results'])
+        return _OpenEndedPage(rows[:self.per_page], number, self, has_more=len(rows) > self.per_page)
+
+
+class TransactionResultsSetPagination(StandardResultsSetPagination):
+    """Pagination for /transactions/ searches, whose matches are counted up to TRANSACTION_COUNT_CAP."""
+    django_paginator_class = CappedCountPaginator
+
+
 class WalletViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows wallets to be viewed, ordered by balance.
     Supports pagination and includes USD balance.
     Can be looked up by wallet address.
+    Can be sorted by profile columns with `?ordering=` (see WALLET_ORDERING_FIELDS).
     """
-    queryset = Wallet.objects.all().order_by('-balance')
     serializer_class = WalletSerializer
     lookup_field = 'address'
     pagination_class = StandardResultsSetPagination
 
+    def get_queryset(self):
+        return wallet_queryset(self.request.query_params)
+
+    @action(detail=True, methods=['get'])
+    def profile(self, request, address=None):
+        """Returns the wallet's activity summary (totals, net flow, activity window, favourite protocol)."""
+        wallet = self.get_object()
+        try:
+            profile = wallet.profile
+        except WalletProfile.DoesNotExist:
+            profile = WalletProfile(wallet=wallet)
+        return Response(WalletProfileSerializer(profile).data)
+
     def get_serializer_context(self):
         context = super().get_serializer_context()
         context['solana_price'] = self._get_solana_price()
@@ -52,24 +270,18 @@ class WalletViewSet(viewsets.ReadOnlyModelViewSet):
 class TransactionViewSet(viewsets.ReadOnlyModelViewSet):
     """
     API endpoint that allows transactions to be viewed, ordered by timestamp.
-    Can be filtered by wallet address using the `?wallet=` query parameter.
+    Can be filtered by wallet address using the `?wallet=` query parameter,
+    and searched/filtered with the parameters described in filter_transactions.
     """
     serializer_class = TransactionSerializer
-    pagination_class = StandardResultsSetPagination
+    pagination_class = TransactionResultsSetPagination
 
     def get_queryset(self):
         """
-        Optionally restricts the returned transactions to a given wallet.
-        Returns all transactions if no wallet is specified.
+        Optionally restricts the returned transactions with the search/filter parameters.
+        Returns all transactions if none are specified.
         """
-        queryset = Transaction.objects.all().order_by('-timestamp')
-
-        # Filter by wallet address if the 'wallet' query parameter is provided
-        wallet_address = self.request.query_params.get('wallet')
-        if wallet_address:
-            queryset = queryset.filter(wallet__address=wallet_address)
-
-        return queryset
+        return transaction_queryset(self.request.query_params)
 
 
 class HistoricalTransactionViewSet(viewsets.ReadOnlyModelViewSet):
@@ -79,18 +291,27 @@ class HistoricalTransactionViewSet(viewsets.ReadOnlyModelViewSet):
 
     def get_queryset(self):
         """Filter transactions by a given date range."""
-        queryset = Transaction.objects.all().order_by('-timestamp')
-        start_date = self.request.query_params.get('start_date')
-        end_date = self.request.query_params.get('end_date')
-
-        if start_date:
-            queryset = queryset.filter(timestamp__gte=start_date)
-        if end_date:
-            # Add 1 day to the end_date to make it inclusive
-            from datetime import datetime, timedelta
-            end_date_dt = datetime.strptime(end_date, '%Y-%m-%d') + timedelta(days=1)
-            queryset = queryset.filter(timestamp__lt=end_date_dt)
-            
+        return historical_transaction_queryset(self.request.query_params)
+
+
+class AlertViewSet(viewsets.ReadOnlyModelViewSet):
+    """
+    API endpoint that allows alerts to be viewed, newest first.
+    Can be filtered with the `?wallet=` and `?rule=` query parameters.
+    """
+    serializer_class = AlertSerializer
+    pagination_class = StandardResultsSetPagination
+
+    def get_queryset(self):
+        queryset = Alert.objects.all().order_by('-created_at')
+
+        wallet_address = self.request.query_params.get('wallet')
+        if wallet_address:
+            queryset = queryset.filter(wallet_id=wallet_address)
+        rule = self.request.query_params.get('rule')
+        if rule:
+            queryset = queryset.filter(rule=rule)
+
         return queryset
 
 
@@ -128,6 +349,25 @@ class DashboardMetricsView(views.APIView):
         return Response(data)
 
 
+class AnalyticsQueryView(views.APIView):
+    """
+    API endpoint that runs a preset analytical query over the Parquet snapshots with DuckDB.
+    Usage: `?preset=volume_by_protocol&start=2025-01-01&end=2025-03-31&bucket=week`.
+    Never touches the transactional database.
+    """
+
+    def get(self, request, *args, **kwargs):
+        preset = request.query_params.get('preset')
+        if not preset:
+            presets = {name: {'description': p['description'], 'params': p['params']} for name, p in PRESETS.items()}
+            return Response({"error": "The 'preset' query parameter is required.", "presets": presets},
+                            status=status.HTTP_400_BAD_REQUEST)
+        try:
+            return Response(run_preset(preset, request.query_params))
+        except AnalyticsError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+
+
 class SolanaStatsView(views.APIView):
     """API view to fetch cached Solana market data."""
     def get(self, request, *args, **kwargs):
@@ -158,3 +398,197 @@ class RefreshDataView(views.APIView):
         except Exception as e:
             logging.error(f"Failed to initiate data refresh task: {e}", exc_info=True)
             return Response({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+class HeliusWebhookView(views.APIView):
+    """
+    Receiver for Helius enhanced-transaction webhooks.
+    Deliveries must carry HELIUS_WEBHOOK_SECRET in the Authorization header. Valid bodies are
+    appended to the webhook stream and stored by the consumer, so the response is immediate.
+    """
+    authentication_classes = []
+    permission_classes = []
+
+    def post(self, request, *args, **kwargs):
+        if not verify_webhook_secret(request.headers.get('Authorization')):
+            return Response({"error": "Invalid webhook secret."}, status=status.HTTP_401_UNAUTHORIZED)
+        body = request.body
+        try:
+            transactions, rejected = parse_payload(body)
+        except ValueError as e:
+            return Response({"error": str(e)}, status=status.HTTP_400_BAD_REQUEST)
+        if transactions:
+            # Only the transactions that passed validation are queued.
+            enqueue_payload(json.dumps(transactions) if rejected else body)
+        return Response(
+            {"status": "accepted", "transactions": len(transactions), "rejected": rejected},
+            status=status.HTTP_202_ACCEPTED,
+        )
+
+
+# --- Async read path -------------------------------------------------------
+# Native async implementations of the read endpoints, routed in place of the DRF
+# views when ASYNC_READ_VIEWS is enabled (the default under tokenwise/asgi.py).
+# They return the same JSON shapes, but a slow query only parks a coroutine
+# instead of holding a worker thread.
+
+async def _get_solana_price():
+    """Async counterpart of WalletViewSet._get_solana_price."""
+    stats_metric = await SolanaMetric.objects.filter(name='solana_stats').afirst()
+    if stats_metric is None:
+        print("Warning: Solana price not found in database. Returning 0.")
+        return 0
+    return stats_metric.data.get('price', 0)
+
+
+async def _alist(queryset):
+    return [obj async for obj in queryset]
+
+
+async def apaginate(request, queryset, serializer_class, context=None, count_cap=None):
+    """
+    Paginates a queryset the way StandardResultsSetPagination does and returns a
+    response with the same count/next/previous/results envelope, in the negotiated format.
+    The count and the page rows are fetched concurrently. With `count_cap`, at most that
+    many rows are counted, like CappedCountPaginator; `next` is based on the rows themselves,
+    so it stays valid past the cap.
+    """
+    pagination = StandardResultsSetPagination
+    try:
+        page_size = min(int(request.GET[pagination.page_size_query_param]), pagination.max_page_size)
+        if page_size <= 0:
+            raise ValueError
+    except (KeyError, ValueError):
+        page_size = pagination.page_size
+    try:
+        page = int(request.GET.get(pagination.page_query_param, 1))
+        if page <= 0:
+            raise ValueError
+    except ValueError:
+        return JsonResponse({'detail': "Invalid page."}, status=status.HTTP_404_NOT_FOUND)
+
+    offset = (page - 1) * page_size
+    counted = queryset if count_cap is None else queryset[:count_cap + 1]
+    # One extra row tells whether another page follows.
+    count, rows = await asyncio.gather(
+        counted.acount(),
+        _alist(queryset[offset:offset + page_size + 1]),
+    )
+    has_next = len(rows) > page_size
+    rows = rows[:page_size]
+    if count_cap is not None:
+        count = min(count, count_cap)
+    if page > 1 and not rows:
+        return JsonResponse({'detail': "Invalid page."}, status=status.HTTP_404_NOT_FOUND)
+
+    url = request.build_absolute_uri()
+    next_link = replace_query_param(url, pagination.page_query_param, page + 1) if has_next else None
+    if page == 1:
+        previous_link = None
+    elif page == 2:
+        previous_link = remove_query_param(url, pagination.page_query_param)
+    else:
+        previous_link = replace_query_param(url, pagination.page_query_param, page - 1)
+
+    return render_response(request, {
+        'count': count,
+        'next': next_link,
+        'previous': previous_link,
+        'results': serializer_class(rows, many=True, context=context or {}).data,
+    })
+
+
+class AsyncWalletListView(View):
+    """Async counterpart of WalletViewSet.list."""
+
+    async def get(self, request, *args, **kwargs):
+        price = await _get_solana_price()
+        queryset = wallet_queryset(request.GET)
+        return await apaginate(request, queryset, WalletSerializer, context={'solana_price': price})
+
+
+class AsyncWalletDetailView(View):
+    """Async counterpart of WalletViewSet.retrieve."""
+
+    async def get(self, request, address, *args, **kwargs):
+        wallet, price = await asyncio.gather(
+            Wallet.objects.select_related('profile').filter(address=address).afirst(),
+            _get_solana_price(),
+        )
+        if wallet is None:
+            return JsonResponse({'detail': "No Wallet matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        return render_response(request, WalletSerializer(wallet, context={'solana_price': price}).data)
+
+
+class AsyncTransactionListView(View):
+    """Async counterpart of TransactionViewSet.list."""
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            queryset = transaction_queryset(request.GET)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        return await apaginate(request, queryset, TransactionSerializer, count_cap=settings.TRANSACTION_COUNT_CAP)
+
+
+class AsyncTransactionDetailView(View):
+    """Async counterpart of TransactionViewSet.retrieve."""
+
+    async def get(self, request, signature, *args, **kwargs):
+        transaction = await Transaction.objects.filter(signature=signature).afirst()
+        if transaction is None:
+            return JsonResponse({'detail': "No Transaction matches the given query."}, status=status.HTTP_404_NOT_FOUND)
+        return render_response(request, TransactionSerializer(transaction).data)
+
+
+class AsyncHistoricalTransactionListView(View):
+    """Async counterpart of HistoricalTransactionViewSet.list."""
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            queryset = historical_transaction_queryset(request.GET)
+        except ValidationError as e:
+            return JsonResponse(e.detail, status=status.HTTP_400_BAD_REQUEST)
+        return await apaginate(request, queryset, HistoricalTransactionSerializer)
+
+
+class AsyncDashboardMetricsView(View):
+    """Async counterpart of DashboardMetricsView."""
+
+    async def get(self, request, *args, **kwargs):
+        # Volume totals are folded into one conditional aggregate and run alongside
+        # the protocol breakdown, so the endpoint costs two concurrent queries.
+        totals, protocol_usage = await asyncio.gather(
+            Transaction.objects.aaggregate(
+                total_volume=Sum('amount'),
+                buy_volume=Sum('amount', filter=Q(transaction_type='BUY')),
+                sell_volume=Sum('amount', filter=Q(transaction_type='SELL')),
+                total_transactions=Count('signature'),
+            ),
+            _alist(Transaction.objects.values('protocol').annotate(count=Count('protocol')).order_by('-count')),
+        )
+
+        data = {
+            'total_volume': totals['total_volume'] or 0,
+            'net_direction': (totals['buy_volume'] or 0) - (totals['sell_volume'] or 0),
+            'total_transactions': totals['total_transactions'],
+            'protocol_usage': protocol_usage,
+        }
+
+        return render_response(request, data)
+
+
+class AsyncSolanaStatsView(View):
+    """Async counterpart of SolanaStatsView."""
+
+    async def get(self, request, *args, **kwargs):
+        try:
+            solana_metric = await SolanaMetric.objects.filter(name='solana_stats').afirst()
+        except Exception as e:
+            return JsonResponse({"error": str(e)}, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+        if solana_metric is None:
+            return JsonResponse(
+                {"error": "Solana market data not found. Please run the refresh command."},
+                status=status.HTTP_404_NOT_FOUND
+            )
+        return render_response(request, solana_metric.data)
@@ -0,0 +1,232 @@
+import hmac
+import json
+import os
+import socket
+from datetime import datetime, timezone
+from django.conf import settings
+from .clients import get_redis_client
+from .scheduler import postpone_wallets
+from .services import ingest_enhanced_transactions
+
+# Webhook deliveries are appended to a Redis stream by the receiver and drained by a
+# consumer group, so the HTTP endpoint only authenticates and enqueues. Entries are
+# acknowledged after their transactions are stored; entries left pending by a crashed
+# consumer (or whose storage failed) are reclaimed by the next one, and moved to the
+# WEBHOOK_DEAD_LETTER_STREAM after WEBHOOK_MAX_DELIVERIES attempts. Storage deduplicates
+# by signature, so a redelivered entry (or a transaction also picked up by polling) is
+# stored only once.
+
+CONSUMER_GROUP = 'ingestion'
+# Pending entries idle for longer than this are assumed abandoned and reclaimed.
+RECLAIM_IDLE_MS = 60_000
+
+
+def verify_webhook_secret(header_value):
+    """Checks the Authorization header Helius sends with every delivery against HELIUS_WEBHOOK_SECRET."""
+    secret = settings.HELIUS_WEBHOOK_SECRET
+    if not secret or not header_value:
+        return False
+    return hmac.compare_digest(header_value.encode(), secret.encode())
+
+
+TRANSFER_ACCOUNT_FIELDS = ('mint', 'fromTokenAccount', 'toTokenAccount', 'fromUserAccount', 'toUserAccount')
+
+
+def clean_transaction(tx):
+    """
+    Checks the fields ingestion relies on and normalises the optional ones (a null
+    `tokenTransfers` or `events` becomes empty). Raises ValueError if the transaction is unusable.
+    """
+    if not isinstance(tx, dict):
+        raise ValueError("not a JSON object")
+    signature = tx.get('signature')
+    if not isinstance(signature, str) or not signature:
+        raise ValueError("missing signature")
+    timestamp = tx.get('timestamp')
+    if isinstance(timestamp, bool) or not isinstance(timestamp, (int, float)):
+        raise ValueError(f"{signature}: missing or non-numeric timestamp")
+    try:
+        datetime.fromtimestamp(timestamp, tz=timezone.utc)
+    except (OverflowError, OSError, ValueError):
+        raise ValueError(f"{signature}: timestamp {timestamp} is out of range")
+
+    transfers = tx.get('tokenTransfers') or []
+    if not isinstance(transfers, list) or not all(isinstance(t, dict) for t in transfers):
+        raise ValueError(f"{signature}: tokenTransfers is not a list of objects")
+    for transfer in transfers:
+        for field in TRANSFER_ACCOUNT_FIELDS:
+            if not isinstance(transfer.get(field), (str, type(None))):
+                raise ValueError(f"{signature}: transfer {field} is not a string")
+
+    events = tx.get('events') or {}
+    if not isinstance(events, dict) or not isinstance(events.get('swap', {}), dict):
+        events = {}
+    description = tx.get('description')
+    return {
+        **tx,
+        'tokenTransfers': transfers,
+        'events': events,
+        'description': description if isinstance(description, str) else '',
+    }
+
+
+def parse_payload(body):
+    """
+    Decodes a delivery body into a list of enhanced transactions, dropping the ones that
+    fail clean_transaction. Returns (transactions, rejected_count). Raises ValueError if
+    the body is not a JSON array (or object) at all.
+    """
+    payload = json.loads(body)
+    if isinstance(payload, dict):
+        payload = [payload]
+    if not isinstance(payload, list):
+        raise ValueError("Expected a JSON array of enhanced transactions.")
+
+    transactions = []
+    for tx in payload:
+        try:
+            transactions.append(clean_transaction(tx))
+        except ValueError as e:
+            print(f"Skipping invalid webhook transaction: {e}")
+    return transactions, len(payload) - len(transactions)
+
+
+def _client():
+    return get_redis_client(settings.WEBHOOK_REDIS_URL)
+
+
+def enqueue_payload(body):
+    """Appends a raw delivery body to the webhook stream. Returns the stream entry id."""
+    return _client().xadd(
+        settings.WEBHOOK_STREAM,
+        {'payload': body},
+        maxlen=settings.WEBHOOK_STREAM_MAXLEN,
+        approximate=True,
+    )
+
+
+def _ensure_group(client):
+    import redis
+    try:
+        client.xgroup_create(settings.WEBHOOK_STREAM, CONSUMER_GROUP, id='0', mkstream=True)
+    except redis.ResponseError as e:
+        if 'BUSYGROUP' not in str(e):
+            raise
+
+
+def _consumer_name():
+    return f'{socket.gethostname()}-{os.getpid()}'
+
+
+def _decode_entries(entries):
+    transactions = []
+    for entry_id, fields in entries:
+        try:
+            transactions.extend(parse_payload(fields[b'payload'])[0])
+        except (KeyError, TypeError, ValueError) as e:
+            # Bodies are validated before they are enqueued, so this only skips corrupt entries.
+            print(f"Skipping malformed webhook entry {entry_id!r}: {e}")
+    return transactions
+
+
+def _dead_letter(client, consumer, entries):
+    """
+    Moves reclaimed entries that were already delivered WEBHOOK_MAX_DELIVERIES times to the
+    dead-letter stream and acknowledges them. Returns the entries to process.
+    """
+    stream = settings.WEBHOOK_STREAM
+    pending = client.xpending_range(
+        stream, CONSUMER_GROUP, min=entries[0][0], max=entries[-1][0], count=len(entries), consumername=consumer
+    )
+    deliveries = {item['message_id']: item['times_delivered'] for item in pending}
+
+    remaining = []
+    for entry_id, fields in entries:
+        times_delivered = deliveries.get(entry_id, 0)
+        if times_delivered <= settings.WEBHOOK_MAX_DELIVERIES:
+            remaining.append((entry_id, fields))
+            continue
+        print(f"Moving webhook entry {entry_id!r} to the dead-letter stream after {times_delivered} deliveries.")
+        client.xadd(
+            settings.WEBHOOK_DEAD_LETTER_STREAM,
+            {**(fields or {}), 'entry_id': entry_id, 'deliveries': times_delivered},
+        )
+        client.xack(stream, CONSUMER_GROUP, entry_id)
+    return remaining
+
+
+def _add_counts(total, stored):
+    for address, count in stored.items():
+        total[address] = total.get(address, 0) + count
+
+
+def _ingest_entries(service, entries):
+    """
+    Stores the transactions of a micro-batch. If that fails, each entry is stored on its own,
+    so one bad delivery does not hold back the others. Returns (stored_entry_ids, stored).
+    """
+    try:
+        # The whole micro-batch is grouped by wallet, so each wallet gets a single bulk insert.
+        return [entry_id for entry_id, _ in entries], ingest_enhanced_transactions(service, _decode_entries(entries))
+    except Exception as e:
+        print(f"Storing a batch of {len(entries)} webhook entries failed ({e}); storing them one by one.")
+
+    entry_ids, stored = [], {}
+    for entry_id, fields in entries:
+        try:
+            _add_counts(stored, ingest_enhanced_transactions(service, _decode_entries([(entry_id, fields)])))
+        except Exception as e:
+            # Left pending: it is reclaimed after RECLAIM_IDLE_MS and eventually dead-lettered.
+            print(f"Could not store webhook entry {entry_id!r}: {e}")
+            continue
+        entry_ids.append(entry_id)
+    return entry_ids, stored
+
+
+def consume_webhook_batch(service, batch_size=None, block_ms=None):
+    """
+    Reads one micro-batch of deliveries from the stream, stores their transactions and
+    acknowledges the entries that were stored. Abandoned entries of other consumers are
+    reclaimed first. Returns (entries, stored), where `stored` maps wallet addresses to
+    new transaction counts.
+    """
+    client = _client()
+    _ensure_group(client)
+    stream = settings.WEBHOOK_STREAM
+    batch_size = batch_size or settings.WEBHOOK_BATCH_SIZE
+    consumer = _consumer_name()
+
+    _, entries, *_ = client.xautoclaim(
+        stream, CONSUMER_GROUP, consumer, min_idle_time=RECLAIM_IDLE_MS, count=batch_size
+    )
+    if entries:
+        claimed = len(entries)
+        entries = _dead_letter(client, consumer, entries)
+    else:
+        response = client.xreadgroup(
+            CONSUMER_GROUP, consumer, {stream: '>'}, count=batch_size, block=block_ms
+        )
+        entries = response[0][1] if response else []
+        claimed = len(entries)
+    if not entries:
+        return claimed, {}
+
+    entry_ids, stored = _ingest_entries(service, entries)
+    if entry_ids:
+        client.xack(stream, CONSUMER_GROUP, *entry_ids)
+    # Polling would only find what was just stored, so these wallets are polled later.
+    postpone_wallets([address for address, count in stored.items() if count])
+    return claimed, stored
+
+
+def drain_webhook_stream(service, max_batches=100):
+    """Consumes micro-batches until the stream is empty or `max_batches` were processed."""
+    total_entries = 0
+    total_stored = 0
+    for _ in range(max_batches):
+        entries, stored = consume_webhook_batch(service)
+        if not entries:
+            break
+        total_entries += entries
+        total_stored += sum(stored.values())
+    return total_entries, total_stored